@@ -1,12 +1,34 @@
+import time
 import streamlit as st
-from src.pipeline import answer_question
+from src.metrics import log_query_metrics
+from src.pipeline import stream_answer
 
 st.title("RAG QA System - AI Research Papers")
 query = st.text_input("Ask a question about AI research papers")
 
 if query:
-    answer, sources = answer_question(query)
-    st.write("### Answer:", answer)
-    st.write("### Sources:")
-    for doc in sources:
-        st.write(f"**Page**: {doc.metadata.get('page', 'N/A')} - **Content**: {doc.page_content[:300]}...")
\ No newline at end of file
+    started = time.perf_counter()
+    metrics = {"query": query}
+    st.write("### Answer:")
+    answer_placeholder = st.empty()
+    answer = ""
+    for kind, payload in stream_answer(query):
+        elapsed = time.perf_counter() - started
+        if kind == "sources":
+            metrics["retrieval_s"] = round(elapsed, 4)
+            st.write("### Sources:")
+            for doc in payload:
+                st.write(f"**Page**: {doc.metadata.get('page', 'N/A')} - **Content**: {doc.page_content[:300]}...")
+        elif kind == "context":
+            metrics["context_tokens"] = payload["context_tokens"]
+            metrics["baseline_tokens"] = payload["baseline_tokens"]
+            metrics["saved_tokens"] = payload["saved_tokens"]
+        else:
+            metrics.setdefault("first_token_s", round(elapsed, 4))
+            answer += payload
+            answer_placeholder.markdown(answer)
+    metrics["total_s"] = round(time.perf_counter() - started, 4)
+    log_query_metrics(metrics)
+
+    with st.expander("Debug: latency"):
+        st.json(metrics)
@@ -0,0 +1,206 @@
+"""Offline benchmark for the Day 3 RAG pipeline.
+
+Generates a synthetic PDF corpus with planted facts, builds the index with the code in
+`src/`, answers one question per planted fact through a deterministic stub LLM and
+writes a JSON report that can be diffed between runs. No network access is needed
+once the MiniLM model is in the local Hugging Face cache.
+
+    python -m benchmarks.rag_benchmark --docs 50 --pages 8 --output bench_results/baseline.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = (
+    "attention transformer encoder decoder layer token embedding gradient retrieval "
+    "generation corpus sequence model training inference latency vector index query "
+    "passage memory parameter dataset benchmark objective softmax residual normalization"
+).split()
+LINES_PER_PAGE = 45
+WORDS_PER_LINE = 12
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path, pages):
+    """Write a minimal text-only PDF, one list of lines per page."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for lines in pages:
+        body = "BT /F1 10 Tf 12 TL 40 780 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_refs))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+def generate_corpus(folder, docs, pages, seed):
+    """Write `docs` PDFs of `pages` pages each and plant one retrievable fact per page."""
+    rng = random.Random(seed)
+    facts = []
+    os.makedirs(folder, exist_ok=True)
+    for d in range(docs):
+        doc_pages = []
+        for p in range(pages):
+            lines = [" ".join(rng.choice(WORDS) for _ in range(WORDS_PER_LINE)) for _ in range(LINES_PER_PAGE)]
+            answer = f"{rng.choice(WORDS)}{rng.randrange(10000, 99999)}"
+            subject = f"experiment {d}-{p}"
+            lines[rng.randrange(LINES_PER_PAGE)] = f"The codename assigned to {subject} is {answer}."
+            facts.append({"question": f"What is the codename assigned to {subject}?", "answer": answer})
+            doc_pages.append(lines)
+        write_pdf(os.path.join(folder, f"synthetic_{d:05d}.pdf"), doc_pages)
+    return facts
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux; children covers the ingestion worker processes.
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return round(self_rss, 1), round(children_rss, 1)
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="rag_bench_") if args.workdir is None else args.workdir
+    facts = generate_corpus(os.path.join(workdir, "data"), args.docs, args.pages, args.seed)
+    if args.queries:
+        facts = random.Random(args.seed).sample(facts, min(args.queries, len(facts)))
+
+    # src/ resolves data/ and vectorstore/ relative to the working directory, so the
+    # benchmark runs against its own corpus and cold caches without touching the project's.
+    os.chdir(workdir)
+    sys.path.insert(0, PROJECT_ROOT)
+    from langchain.chains import RetrievalQA
+    from langchain_core.language_models.llms import LLM
+    from src.context import pack_context
+    from src.preprocess import IngestStats, PDF_FOLDER, iter_chunks, list_pdfs
+    from src.retriever import load_vectorstore
+
+    class StubLLM(LLM):
+        """Deterministic stand-in for Gemini: a short digest of the prompt."""
+
+        @property
+        def _llm_type(self):
+            return "stub"
+
+        def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+            return f"stub-answer-{hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:12]}"
+
+    report = {
+        "config": {"dedup_threshold": args.dedup_threshold, "docs": args.docs, "pages_per_doc": args.pages, "queries": len(facts), "k": args.k, "seed": args.seed},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()},
+    }
+
+    stats = IngestStats()
+    for _ in iter_chunks([os.path.join(PDF_FOLDER, file) for file in list_pdfs()], stats=stats, dedup_threshold=args.dedup_threshold):
+        pass
+    report["ingestion"] = {
+        "pages": stats.pages,
+        "chunks": stats.chunks,
+        "seconds": round(stats.elapsed, 4),
+        "pages_per_s": round(stats.pages / stats.elapsed, 2),
+        "chunks_per_s": round(stats.chunks / stats.elapsed, 2),
+        "duplicate_chunks_dropped": stats.duplicates,
+    }
+
+    started = time.perf_counter()
+    vectorstore = load_vectorstore(mode="memory")
+    report["index_build"] = {"seconds": round(time.perf_counter() - started, 4), "vectors": vectorstore.index.ntotal}
+
+    qa_chain = RetrievalQA.from_chain_type(
+        llm=StubLLM(),
+        retriever=vectorstore.as_retriever(search_kwargs={"k": args.k}),
+        return_source_documents=True,
+    )
+    combine = qa_chain.combine_documents_chain
+    latencies, found, retrieved_tokens, baseline_tokens, context_tokens = [], 0, 0, 0, 0
+    for fact in facts:
+        started = time.perf_counter()
+        # Same retrieve -> pack -> generate path as src/pipeline.py
+        docs = qa_chain.retriever.invoke(fact["question"])
+        context, _, packing = pack_context(docs)
+        combine.run(input_documents=context, question=fact["question"])
+        latencies.append((time.perf_counter() - started) * 1000)
+        found += any(fact["answer"] in doc.page_content for doc in context)
+        retrieved_tokens += packing["retrieved_tokens"]
+        baseline_tokens += packing["baseline_tokens"]
+        context_tokens += packing["context_tokens"]
+    report["query"] = {
+        "latency_ms": {f"p{q}": round(percentile(latencies, q), 3) for q in (50, 95, 99)},
+        f"recall_at_{args.k}": round(found / len(facts), 4) if facts else None,
+        "mean_retrieved_tokens": round(retrieved_tokens / len(facts), 1) if facts else None,
+        "mean_baseline_tokens": round(baseline_tokens / len(facts), 1) if facts else None,
+        "mean_context_tokens": round(context_tokens / len(facts), 1) if facts else None,
+    }
+
+    self_rss, children_rss = peak_rss_mb()
+    report["memory"] = {"peak_rss_mb": self_rss, "peak_rss_workers_mb": children_rss}
+
+    if args.workdir is None and not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the Day 3 RAG pipeline")
+    parser.add_argument("--docs", type=int, default=20, help="number of synthetic PDFs")
+    parser.add_argument("--pages", type=int, default=5, help="pages per PDF")
+    parser.add_argument("--queries", type=int, default=200, help="planted facts to query (0 = all)")
+    parser.add_argument("--k", type=int, default=6, help="retrieved chunks per query, before context packing")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--dedup-threshold", type=float, default=None, help="near-duplicate threshold (0 disables dedup)")
+    parser.add_argument("--workdir", default=None, help="reuse a directory instead of a fresh temp dir")
+    parser.add_argument("--keep", action="store_true", help="keep the temp corpus and index")
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    if args.dedup_threshold is not None:
+        # Set before src/ is imported so the index build uses the same threshold.
+        os.environ["RAG_DEDUP_THRESHOLD"] = str(args.dedup_threshold)
+    else:
+        args.dedup_threshold = float(os.getenv("RAG_DEDUP_THRESHOLD", "0.85"))
+    report = run(args)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[INFO] Benchmark report written to {output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.documents import Document
+
+ANSWER_CACHE_PATH = "vectorstore/answer_cache.json"
+SIMILARITY_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.95"))
+MAX_ENTRIES = int(os.getenv("RAG_ANSWER_CACHE_SIZE", "1000"))
+TTL_SECONDS = float(os.getenv("RAG_ANSWER_CACHE_TTL", str(24 * 3600)))
+
+
+class AnswerCache:
+    """Semantic cache of answers keyed by question embedding.
+
+    A question whose cosine similarity to a cached question is at least `threshold`
+    gets the cached answer and sources. Entries are evicted least-recently-used past
+    `max_entries` or once older than `ttl`, and the whole cache is dropped when the
+    vector index version it was built against changes.
+    """
+
+    def __init__(self, index_version, path=ANSWER_CACHE_PATH, threshold=SIMILARITY_THRESHOLD, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.index_version = index_version
+        self.entries = OrderedDict()
+        self.matrix = None
+        self.keys = []
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("index_version") != self.index_version:
+            return
+        for entry in data["entries"]:
+            self.entries[entry["question"]] = entry
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"index_version": self.index_version, "entries": list(self.entries.values())}, f)
+        os.replace(tmp_path, self.path)
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        expired = [key for key, entry in self.entries.items() if entry["created"] < cutoff]
+        for key in expired:
+            del self.entries[key]
+        while len(self.entries) > self.max_entries:
+            expired.append(self.entries.popitem(last=False)[0])
+        if expired:
+            self.matrix = None
+
+    def set_index_version(self, index_version):
+        with self.lock:
+            if index_version != self.index_version:
+                self.index_version = index_version
+                self.entries.clear()
+                self.matrix = None
+                self._save()
+
+    def lookup(self, vector):
+        with self.lock:
+            self._expire()
+            if not self.entries:
+                self.misses += 1
+                return None
+            if self.matrix is None:
+                # Rows follow self.keys; LRU reordering of self.entries doesn't invalidate them.
+                self.keys = list(self.entries)
+                self.matrix = np.array([entry["vector"] for entry in self.entries.values()], dtype=np.float32)
+                self.matrix /= np.linalg.norm(self.matrix, axis=1, keepdims=True)
+            query = np.asarray(vector, dtype=np.float32)
+            scores = self.matrix @ (query / np.linalg.norm(query))
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            key = self.keys[best]
+            self.entries.move_to_end(key)
+            self.hits += 1
+            entry = self.entries[key]
+        sources = [Document(page_content=doc["page_content"], metadata=doc["metadata"]) for doc in entry["sources"]]
+        return entry["answer"], sources
+
+    def store(self, question, vector, answer, sources, save=True):
+        with self.lock:
+            self.entries.pop(question, None)
+            self.entries[question] = {
+                "question": question,
+                "vector": [float(x) for x in vector],
+                "answer": answer,
+                "sources": [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in sources],
+                "created": time.time(),
+            }
+            self.matrix = None
+            self._expire()
+            if save:
+                self._save()
+
+    def flush(self):
+        with self.lock:
+            self._save()
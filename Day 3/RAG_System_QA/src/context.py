@@ -0,0 +1,108 @@
+import os
+
+from langchain_core.documents import Document
+
+# No local Gemini tokenizer, so tokens are estimated from characters.
+CHARS_PER_TOKEN = 4
+# Before packing, the pipeline sent its top BASELINE_K chunks (up to 1000 characters each)
+# unchanged; savings are reported against that.
+BASELINE_K = 3
+# Token budget for the retrieved context sent to Gemini; by default no more than the baseline sent.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKENS", str(BASELINE_K * 1000 // CHARS_PER_TOKEN)))
+# Chunks are split with chunk_overlap=200; overlaps shorter than MIN_OVERLAP are ignored as coincidence.
+MAX_OVERLAP = 400
+MIN_OVERLAP = 20
+# Lines this long that already appeared in an earlier block are dropped as repeats.
+MIN_REPEATED_LINE = 40
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _overlap(left, right):
+    """Length of the longest suffix of `left` that is also a prefix of `right`."""
+    for size in range(min(len(left), len(right), MAX_OVERLAP), MIN_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+def _merge_segments(segments):
+    """Merge (text, rank, docs) segments from one page that contain or overlap each other."""
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(segments)):
+            for j in range(len(segments)):
+                if i == j:
+                    continue
+                (a, rank_a, docs_a), (b, rank_b, docs_b) = segments[i], segments[j]
+                if b in a:
+                    text = a
+                else:
+                    size = _overlap(a, b)
+                    if not size:
+                        continue
+                    text = a + b[size:]
+                segments[i] = (text, min(rank_a, rank_b), docs_a + docs_b)
+                del segments[j]
+                merged = True
+                break
+            if merged:
+                break
+    return segments
+
+def _strip_repeated_lines(text, seen):
+    lines = []
+    for line in text.splitlines():
+        key = " ".join(line.split()).lower()
+        if len(key) >= MIN_REPEATED_LINE:
+            if key in seen:
+                continue
+            seen.add(key)
+        lines.append(line)
+    return "\n".join(lines)
+
+def pack_context(docs, token_budget=CONTEXT_TOKEN_BUDGET):
+    """Merge overlapping chunks and fill `token_budget` with the most relevant distinct text.
+
+    `docs` must be in retrieval order. Returns (context_docs, source_docs, stats): the
+    merged blocks to send to the LLM, the retrieved chunks that made it into them, and
+    token counts. `saved_tokens` compares the packed context with what the unpacked
+    top-BASELINE_K pipeline would have sent, so it goes negative if packing sends more.
+    """
+    pages = {}
+    for rank, doc in enumerate(docs):
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        pages.setdefault(key, []).append((doc.page_content, rank, [doc]))
+    blocks = []
+    for (source, page), segments in pages.items():
+        for text, rank, block_docs in _merge_segments(segments):
+            blocks.append((rank, source, page, text, block_docs))
+    blocks.sort(key=lambda block: block[0])
+
+    context, sources, seen, remaining = [], [], set(), token_budget
+    for _, source, page, text, block_docs in blocks:
+        text = _strip_repeated_lines(text, seen).strip()
+        if not text or remaining <= 0:
+            continue
+        tokens = estimate_tokens(text)
+        if tokens > remaining:
+            # Cut the last block at a word boundary rather than mid-word.
+            text = text[:remaining * CHARS_PER_TOKEN].rsplit(" ", 1)[0]
+            tokens = estimate_tokens(text)
+        remaining -= tokens
+        context.append(Document(page_content=text, metadata={"source": source, "page": page}))
+        sources.extend(sorted(block_docs, key=docs.index))
+
+    retrieved_tokens = sum(estimate_tokens(doc.page_content) for doc in docs)
+    baseline_tokens = sum(estimate_tokens(doc.page_content) for doc in docs[:BASELINE_K])
+    context_tokens = sum(estimate_tokens(doc.page_content) for doc in context)
+    stats = {
+        "retrieved_chunks": len(docs),
+        "context_blocks": len(context),
+        "retrieved_tokens": retrieved_tokens,
+        "baseline_tokens": baseline_tokens,
+        "context_tokens": context_tokens,
+        "saved_tokens": baseline_tokens - context_tokens,
+    }
+    return context, sources, stats
@@ -0,0 +1,68 @@
+import re
+import zlib
+
+import numpy as np
+
+# 2^31 - 1 keeps (a * hash + b) inside int64 for 32-bit shingle hashes.
+_PRIME = (1 << 31) - 1
+
+
+class MinHashLSH:
+    """MinHash signatures over word shingles, bucketed with banded LSH.
+
+    `add` returns the index of an earlier near-duplicate (estimated Jaccard similarity
+    at or above `threshold`) or None when the text is new.
+    """
+
+    def __init__(self, threshold=0.85, num_perm=64, bands=16, shingle_size=3, seed=1):
+        rng = np.random.RandomState(seed)
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.a = rng.randint(1, _PRIME, num_perm).astype(np.int64)
+        self.b = rng.randint(0, _PRIME, num_perm).astype(np.int64)
+        self.buckets = {}
+        self.signatures = []
+
+    def signature(self, text):
+        words = re.findall(r"\w+", text.lower())
+        n = self.shingle_size
+        shingles = {" ".join(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.int64, count=len(shingles))
+        return ((np.outer(hashes, self.a) + self.b) % _PRIME).min(axis=0)
+
+    def add(self, text):
+        signature = self.signature(text)
+        keys = [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+        for key in keys:
+            for candidate in self.buckets.get(key, ()):
+                if np.mean(self.signatures[candidate] == signature) >= self.threshold:
+                    return candidate
+        index = len(self.signatures)
+        self.signatures.append(signature)
+        for key in keys:
+            self.buckets.setdefault(key, []).append(index)
+        return None
+
+
+def deduplicate_chunks(chunks, threshold=0.85):
+    """Drop near-duplicate chunks, recording each dropped chunk's page on the chunk that is kept.
+
+    Returns (kept_chunks, dropped_count, dropped_chars).
+    """
+    lsh = MinHashLSH(threshold=threshold)
+    kept, dropped, dropped_chars = [], 0, 0
+    for chunk in chunks:
+        original = lsh.add(chunk.page_content)
+        if original is None:
+            kept.append(chunk)
+            continue
+        canonical = kept[original]
+        page = chunk.metadata.get("page")
+        duplicate_pages = canonical.metadata.setdefault("duplicate_pages", [])
+        if page != canonical.metadata.get("page") and page not in duplicate_pages:
+            duplicate_pages.append(page)
+        dropped += 1
+        dropped_chars += len(chunk.page_content)
+    return kept, dropped, dropped_chars
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+from collections.abc import Mapping
+
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+DOCSTORE_DIR = "docstore"
+LEGACY_SQLITE_FILE = "docstore.sqlite"
+
+
+def _id_hash(doc_id):
+    return int.from_bytes(hashlib.blake2b(doc_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+def _load_array(path, dtype):
+    # np.memmap refuses empty files, and an empty index is legitimate.
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+class _StringColumn:
+    """Variable-length UTF-8 strings stored as one blob plus an int64 offsets array."""
+
+    def __init__(self, path, name):
+        self.blob = _load_array(os.path.join(path, f"{name}.bin"), np.uint8)
+        self.offsets = _load_array(os.path.join(path, f"{name}.idx"), np.int64)
+
+    def raw(self, row):
+        return self.blob[self.offsets[row]:self.offsets[row + 1]].tobytes()
+
+    def __getitem__(self, row):
+        return self.raw(row).decode("utf-8")
+
+
+class _StringColumnWriter:
+    def __init__(self, path, name):
+        self.blob = open(os.path.join(path, f"{name}.bin"), "wb")
+        self.offsets_path = os.path.join(path, f"{name}.idx")
+        self.offsets = [0]
+
+    def append(self, data):
+        self.blob.write(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+
+    def close(self):
+        self.blob.close()
+        np.asarray(self.offsets, dtype=np.int64).tofile(self.offsets_path)
+
+
+class RowIdMap(Mapping):
+    """Lazy FAISS-row -> chunk-ID mapping read straight from the ids column."""
+
+    def __init__(self, docstore):
+        self.docstore = docstore
+
+    def __getitem__(self, row):
+        if not 0 <= row < len(self):
+            raise KeyError(row)
+        return self.docstore.ids[row]
+
+    def __iter__(self):
+        return iter(range(len(self)))
+
+    def __len__(self):
+        return self.docstore.rows
+
+
+class ColumnarDocstore(Docstore, AddableMixin):
+    """Docstore kept as memory-mappable columns instead of one Python Document per chunk.
+
+    Row i holds the chunk at FAISS position i: text and chunk IDs are blob + offsets
+    columns, `source` (an index into sources.json) and `page` are int32 arrays, and any
+    other metadata is a JSON string column. A sorted array of 64-bit ID hashes resolves
+    chunk IDs to rows with a binary search. `Document` objects are only built for the
+    chunks that `search` returns.
+
+    Added and deleted chunks are kept in an overlay until `write` produces new columns,
+    so incremental updates never materialise the whole corpus.
+    """
+
+    def __init__(self, path=None):
+        self.added = {}
+        self.deleted = set()
+        self.rows = 0
+        if path is None or not os.path.isdir(path):
+            return
+        self.text = _StringColumn(path, "text")
+        self.ids = _StringColumn(path, "ids")
+        self.extra = _StringColumn(path, "extra")
+        self.source = _load_array(os.path.join(path, "source.i32"), np.int32)
+        self.page = _load_array(os.path.join(path, "page.i32"), np.int32)
+        self.id_hashes = _load_array(os.path.join(path, "id_hash.u64"), np.uint64)
+        self.id_rows = _load_array(os.path.join(path, "id_row.i64"), np.int64)
+        with open(os.path.join(path, "sources.json"), "r", encoding="utf-8") as f:
+            self.sources = json.load(f)
+        self.rows = len(self.source)
+
+    def _row(self, doc_id):
+        if not self.rows:
+            return None
+        key = np.uint64(_id_hash(doc_id))
+        i = int(np.searchsorted(self.id_hashes, key))
+        while i < len(self.id_hashes) and self.id_hashes[i] == key:
+            row = int(self.id_rows[i])
+            if self.ids[row] == doc_id:
+                return row
+            i += 1
+        return None
+
+    def _fields(self, doc_id):
+        """(text_bytes, source, page, extra_json_bytes) for a live chunk, or None."""
+        if doc_id in self.added:
+            doc = self.added[doc_id]
+            metadata = dict(doc.metadata)
+            source = metadata.pop("source", "")
+            page = metadata.pop("page", -1)
+            extra = json.dumps(metadata).encode("utf-8") if metadata else b""
+            return doc.page_content.encode("utf-8"), source, page, extra
+        if doc_id in self.deleted:
+            return None
+        row = self._row(doc_id)
+        if row is None:
+            return None
+        return self.text.raw(row), self.sources[self.source[row]], int(self.page[row]), self.extra.raw(row)
+
+    def search(self, search):
+        fields = self._fields(search)
+        if fields is None:
+            return f"ID {search} not found."
+        text, source, page, extra = fields
+        metadata = {"source": source, "page": page}
+        if extra:
+            metadata.update(json.loads(extra))
+        return Document(page_content=text.decode("utf-8"), metadata=metadata)
+
+    def add(self, texts):
+        overlapping = [doc_id for doc_id in texts if doc_id in self.added or (doc_id not in self.deleted and self._row(doc_id) is not None)]
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        self.added.update(texts)
+
+    def delete(self, ids):
+        for doc_id in ids:
+            if doc_id in self.added:
+                del self.added[doc_id]
+            elif doc_id not in self.deleted and self._row(doc_id) is not None:
+                self.deleted.add(doc_id)
+            else:
+                raise ValueError(f"ID {doc_id} not found.")
+
+    def write(self, path, index_to_docstore_id):
+        """Write the live chunks in FAISS row order to `path`, replacing it atomically per directory."""
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        text, ids, extra = (_StringColumnWriter(tmp_path, name) for name in ("text", "ids", "extra"))
+        sources, source_rows, pages, hashes = {}, [], [], []
+        for _, doc_id in sorted(index_to_docstore_id.items()):
+            fields = self._fields(doc_id)
+            if fields is None:
+                raise ValueError(f"ID {doc_id} not found.")
+            chunk_text, source, page, chunk_extra = fields
+            text.append(chunk_text)
+            ids.append(doc_id.encode("utf-8"))
+            extra.append(chunk_extra)
+            source_rows.append(sources.setdefault(source, len(sources)))
+            pages.append(page)
+            hashes.append(_id_hash(doc_id))
+        for column in (text, ids, extra):
+            column.close()
+        np.asarray(source_rows, dtype=np.int32).tofile(os.path.join(tmp_path, "source.i32"))
+        np.asarray(pages, dtype=np.int32).tofile(os.path.join(tmp_path, "page.i32"))
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        order = np.argsort(hashes, kind="stable")
+        hashes[order].tofile(os.path.join(tmp_path, "id_hash.u64"))
+        order.astype(np.int64).tofile(os.path.join(tmp_path, "id_row.i64"))
+        with open(os.path.join(tmp_path, "sources.json"), "w", encoding="utf-8") as f:
+            json.dump(list(sources), f)
+
+        # Processes that already mapped the old columns keep reading them until they reopen.
+        old_path = path + ".old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def read_sqlite_docstore(path):
+    """Read a docstore written by the earlier SQLite format, for one-off migration."""
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT pos, id, text, metadata FROM chunks ORDER BY pos").fetchall()
+    conn.close()
+    docstore = InMemoryDocstore({doc_id: Document(page_content=text, metadata=json.loads(metadata)) for _, doc_id, text, metadata in rows})
+    return docstore, {pos: doc_id for pos, doc_id, _, _ in rows}
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only safe from a single process
+    fcntl = None
+
+EMBEDDING_CACHE_DIR = "vectorstore/embedding_cache"
+KEY_BYTES = 16
+# Rows appended since the sorted index was last written are looked up in a dict;
+# once there are this many, the index is rewritten to cover them.
+MERGE_ROWS = 16384
+
+
+def _load_array(path, dtype):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+def _key_hash(key):
+    return np.uint64(int.from_bytes(key[:8], "little"))
+
+
+class CachedEmbeddings(Embeddings):
+    """Content-addressed, on-disk cache in front of a document embedder.
+
+    Vectors live in `vectors.f32` (a raw float32 matrix opened with np.memmap) and
+    `keys.bin` holds the 16-byte text hash of every row, in row order. Both files are
+    append-only, so a rebuild only embeds chunk text the cache has not seen before.
+    `index.u64` is a sorted array of 64-bit key prefixes followed by their rows, so keys
+    resolve to rows with a binary search instead of a dict of every key ever cached.
+
+    Nothing is opened until the first `embed_documents` call; query-only processes never
+    touch the cache. Several processes can share one cache: appends happen under an
+    exclusive file lock, after picking up rows the other processes added.
+    """
+
+    def __init__(self, embedder, model_name, cache_dir=EMBEDDING_CACHE_DIR, batch_size=64):
+        self.embedder = embedder
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.path = os.path.join(cache_dir, model_name.replace("/", "__"))
+        self.hits = 0
+        self.misses = 0
+        self.opened = False
+        self.dim = None
+        self.count = 0
+        self.keys = self.vectors = None
+        self.index_hashes = np.empty(0, dtype=np.uint64)
+        self.index_rows = np.empty(0, dtype=np.int64)
+        self.tail = {}
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    @contextmanager
+    def _lock(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file("cache.lock"), "a+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _refresh(self):
+        """Pick up rows appended by this or another process since the last refresh. Call under _lock."""
+        self.opened = True
+        if self.dim is None:
+            if not os.path.exists(self._file("meta.json")):
+                return
+            with open(self._file("meta.json"), "r", encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+        keys_size = os.path.getsize(self._file("keys.bin")) if os.path.exists(self._file("keys.bin")) else 0
+        vectors_size = os.path.getsize(self._file("vectors.f32")) if os.path.exists(self._file("vectors.f32")) else 0
+        # A build interrupted between the two appends leaves one file longer than the other;
+        # cut both back to the rows that were written completely.
+        count = min(keys_size // KEY_BYTES, vectors_size // (4 * self.dim))
+        if keys_size != count * KEY_BYTES:
+            os.truncate(self._file("keys.bin"), count * KEY_BYTES)
+        if vectors_size != count * 4 * self.dim:
+            os.truncate(self._file("vectors.f32"), count * 4 * self.dim)
+        self._map(count)
+
+        index = _load_array(self._file("index.u64"), np.uint64)
+        indexed = len(index) // 2
+        if indexed > count:
+            index, indexed = index[:0], 0  # written against rows that were since truncated away
+        self.index_hashes, self.index_rows = index[:indexed], index[indexed:].view(np.int64)
+        self.tail = {self.keys[row].tobytes(): row for row in range(indexed, count)}
+        if len(self.tail) >= MERGE_ROWS:
+            self._write_index()
+
+    def _map(self, count):
+        self.count = count
+        self.keys = np.memmap(self._file("keys.bin"), dtype=np.uint8, mode="r", shape=(count, KEY_BYTES)) if count else None
+        self.vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r", shape=(count, self.dim)) if count else None
+
+    def _write_index(self):
+        """Rewrite index.u64 to cover every row, emptying the tail. Call under _lock."""
+        hashes = np.ascontiguousarray(self.keys[:, :8]).view("<u8").ravel().astype(np.uint64)
+        order = np.argsort(hashes, kind="stable")
+        tmp_path = self._file("index.u64.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(hashes[order].tobytes())
+            f.write(order.astype(np.int64).tobytes())
+        # One file, so readers in other processes never see hashes and rows from different writes.
+        os.replace(tmp_path, self._file("index.u64"))
+        index = _load_array(self._file("index.u64"), np.uint64)
+        self.index_hashes, self.index_rows = index[:self.count], index[self.count:].view(np.int64)
+        self.tail = {}
+
+    def _row(self, key):
+        row = self.tail.get(key)
+        if row is not None or not len(self.index_hashes):
+            return row
+        h = _key_hash(key)
+        i = int(np.searchsorted(self.index_hashes, h))
+        while i < len(self.index_hashes) and self.index_hashes[i] == h:
+            row = int(self.index_rows[i])
+            if self.keys[row].tobytes() == key:
+                return row
+            i += 1
+        return None
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).digest()[:KEY_BYTES]
+
+    def _append(self, keys, vectors):
+        """Append rows at the physical end of both files. Call under _lock, after _refresh."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            with open(self._file("meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"model": self.model_name, "dim": self.dim}, f)
+        start = os.path.getsize(self._file("vectors.f32")) // (4 * self.dim) if os.path.exists(self._file("vectors.f32")) else 0
+        # Vectors are written before keys so a key never points past the end of the matrix.
+        with open(self._file("vectors.f32"), "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self._file("keys.bin"), "ab") as f:
+            f.write(b"".join(keys))
+        for i, key in enumerate(keys):
+            self.tail[key] = start + i
+        self._map(start + len(keys))
+        if len(self.tail) >= MERGE_ROWS:
+            self._write_index()
+
+    def _missing(self, keys, texts):
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in missing and self._row(key) is None:
+                missing[key] = text
+        return missing
+
+    def embed_documents(self, texts):
+        if not self.opened:
+            with self._lock():
+                self._refresh()
+        keys = [self._key(text) for text in texts]
+        missing = self._missing(keys, texts)
+        if missing:
+            with self._lock():
+                # Another process may have embedded some of these since this one last looked.
+                self._refresh()
+                missing = self._missing(keys, texts)
+                # Length-bucketed batches keep padding waste low inside the transformer.
+                pending = sorted(missing.items(), key=lambda item: len(item[1]))
+                for i in range(0, len(pending), self.batch_size):
+                    batch = pending[i:i + self.batch_size]
+                    vectors = self.embedder.embed_documents([text for _, text in batch])
+                    self._append([key for key, _ in batch], vectors)
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+
+        if not texts:
+            return []
+        return self.vectors[[self._row(key) for key in keys]].tolist()
+
+    def embed_query(self, text):
+        return self.embedder.embed_query(text)
+
+    def embed_queries(self, texts):
+        # Queries are not cached; this just embeds a whole batch in one model call.
+        return self.embedder.embed_documents(list(texts))
+
+    def report(self):
+        """Print and reset the hit/miss counters accumulated since the last report."""
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0.0
+        print(f"[INFO] Embedding cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate)")
+        counts = {"hits": self.hits, "misses": self.misses}
+        self.hits = self.misses = 0
+        return counts
@@ -0,0 +1,126 @@
+import json
+import math
+import os
+
+import faiss
+import numpy as np
+
+INDEX_CONFIG_FILE = "index_config.json"
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Defaults for a new index; once an index exists, its saved index_config.json wins.
+DEFAULT_CONFIG = {
+    "type": os.getenv("RAG_INDEX_TYPE", "flat"),
+    # "sq8" stores int8 codes instead of float32 vectors (flat, ivf_flat and hnsw only;
+    # ivf_pq always compresses with product quantization).
+    "compression": os.getenv("RAG_INDEX_COMPRESSION", "none"),
+    "nlist": 1024,
+    "pq_m": 48,
+    "pq_nbits": 8,
+    "hnsw_m": 32,
+    "nprobe": 16,
+    "ef_search": 64,
+}
+# Indexes built before index_config.json existed were always exact flat indexes.
+LEGACY_CONFIG = {**DEFAULT_CONFIG, "type": "flat", "compression": "none"}
+BUILD_KEYS = ("type", "compression", "nlist", "pq_m", "pq_nbits", "hnsw_m")
+# Parameters fit_to_sample may shrink below what was requested.
+FITTED_KEYS = ("nlist", "nprobe", "pq_m", "pq_nbits")
+
+
+def load_index_config(folder, default=DEFAULT_CONFIG):
+    path = os.path.join(folder, INDEX_CONFIG_FILE)
+    if not os.path.exists(path):
+        return dict(default)
+    with open(path, "r", encoding="utf-8") as f:
+        return {**default, **json.load(f)}
+
+def save_index_config(folder, config):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, INDEX_CONFIG_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def factory_string(config):
+    index_type = config["type"]
+    storage = "SQ8" if config["compression"] == "sq8" else "Flat"
+    if index_type == "flat":
+        return storage
+    if index_type == "ivf_flat":
+        return f"IVF{config['nlist']},{storage}"
+    if index_type == "ivf_pq":
+        return f"IVF{config['nlist']},PQ{config['pq_m']}x{config['pq_nbits']}"
+    if index_type == "hnsw":
+        return f"HNSW{config['hnsw_m']}" + (",SQ8" if storage == "SQ8" else "")
+    raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+
+def needs_training(config):
+    return config["type"] in ("ivf_flat", "ivf_pq") or config["compression"] == "sq8"
+
+def training_size(config):
+    """How many vectors to collect before a new index can be trained."""
+    config = requested_config(config)
+    if config["type"] in ("ivf_flat", "ivf_pq"):
+        return min(100_000, max(39 * config["nlist"], 256 * 39))
+    return 1_000 if needs_training(config) else 0
+
+def requested_config(config):
+    """`config` with the parameters that were asked for, undoing any fit_to_sample shrinking."""
+    config = dict(config)
+    config.update(config.pop("requested", {}))
+    return config
+
+def fit_to_sample(config, sample_size, dim):
+    """Shrink nlist / PQ parameters so the sample (and vector size) can train the requested index type.
+
+    Always fits from the requested values, which are kept under "requested" whenever they
+    had to shrink, so a rebuild on a bigger corpus gets the full-size index back.
+    """
+    requested = requested_config(config)
+    config = dict(requested)
+    if config["type"] in ("ivf_flat", "ivf_pq"):
+        config["nlist"] = max(1, min(config["nlist"], sample_size // 39))
+        config["nprobe"] = min(config["nprobe"], config["nlist"])
+    if config["type"] == "ivf_pq":
+        # Each PQ codebook has 2^pq_nbits centroids and k-means wants ~39 points per centroid.
+        config["pq_nbits"] = max(1, min(config["pq_nbits"], int(math.log2(max(sample_size // 39, 2)))))
+        # PQ splits each vector into pq_m equal sub-vectors.
+        config["pq_m"] = max(m for m in range(1, min(config["pq_m"], dim) + 1) if dim % m == 0)
+    shrunk = {key: requested[key] for key in FITTED_KEYS if config[key] != requested[key]}
+    if shrunk:
+        config["requested"] = shrunk
+    return config
+
+def outgrown(config, size, dim):
+    """True once `size` vectors would train at least twice the nlist (or more PQ bits) than `config` got."""
+    if "requested" not in config:
+        return False
+    refit = fit_to_sample(config, size, dim)
+    return refit["nlist"] >= 2 * config["nlist"] or refit["pq_nbits"] > config["pq_nbits"]
+
+def apply_search_params(index, config):
+    if isinstance(index, faiss.IndexFlat):
+        return  # exact search has no parameters (this includes empty_index's stand-in)
+    params = faiss.ParameterSpace()
+    if config["type"] in ("ivf_flat", "ivf_pq"):
+        params.set_index_parameter(index, "nprobe", config["nprobe"])
+    elif config["type"] == "hnsw":
+        params.set_index_parameter(index, "efSearch", config["ef_search"])
+
+def empty_index(config, dim):
+    """An index with no vectors. Types that need training fall back to flat: there is nothing to train them on."""
+    return faiss.IndexFlatL2(dim) if needs_training(config) else faiss.index_factory(dim, factory_string(config))
+
+def build_index(config, vectors):
+    """Create an empty index for `config`, trained on `vectors` if the type needs it.
+
+    Returns (index, config) where config reflects any parameters shrunk to fit the sample.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    config = fit_to_sample(config, len(vectors), vectors.shape[1])
+    index = faiss.index_factory(vectors.shape[1], factory_string(config))
+    if not index.is_trained:
+        index.train(vectors)
+    apply_search_params(index, config)
+    return index, config
@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any
+
+from langchain_core.retrievers import BaseRetriever
+
+from .preprocess import PDF_FOLDER, list_pdfs
+from .retriever import INDEX_MODE, build_generation, collect_garbage, current_generation, generation_path, hold_generation, load_manifest, open_vectorstore
+
+# Seconds between checks of data/ for new, changed or removed PDFs; 0 disables the watcher.
+WATCH_INTERVAL = float(os.getenv("RAG_WATCH_INTERVAL", "30"))
+
+
+class Generation:
+    def __init__(self, name, mmap):
+        self.name = name
+        self.lock = hold_generation(name)
+        self.vectorstore = open_vectorstore(generation_path(name), mmap=mmap)
+        self.version = load_manifest(generation_path(name))["version"]
+        self.in_flight = 0
+
+    def close(self):
+        self.vectorstore = None
+        self.lock.close()
+
+
+class LiveIndex:
+    """Read-copy-update holder for the generation that serves queries.
+
+    `acquire` pins the current generation for the duration of one search. `refresh`
+    opens a newly published generation and swaps it in; queries already running finish
+    on the old one, which is closed (and its directory garbage-collected) once drained.
+    """
+
+    def __init__(self, mmap=INDEX_MODE == "mmap"):
+        self.mmap = mmap
+        self.lock = threading.Lock()
+        self.current = None
+        self.retired = []
+        self.listeners = []
+        self.refresh()
+
+    @property
+    def version(self):
+        return self.current.version if self.current else 0
+
+    @contextmanager
+    def acquire(self):
+        with self.lock:
+            generation = self.current
+            generation.in_flight += 1
+        try:
+            yield generation.vectorstore
+        finally:
+            with self.lock:
+                generation.in_flight -= 1
+            self._reap()
+
+    def refresh(self):
+        name = current_generation()
+        if name is None or (self.current is not None and self.current.name == name):
+            return False
+        started = time.perf_counter()
+        generation = Generation(name, self.mmap)
+        with self.lock:
+            if self.current is not None:
+                self.retired.append(self.current)
+            self.current = generation
+        print(f"[INFO] Serving index {name} (version {generation.version}), opened in {time.perf_counter() - started:.3f}s")
+        for listener in self.listeners:
+            listener(generation)
+        self._reap()
+        return True
+
+    def _reap(self):
+        with self.lock:
+            drained = [generation for generation in self.retired if generation.in_flight == 0]
+            self.retired = [generation for generation in self.retired if generation.in_flight]
+        for generation in drained:
+            generation.close()
+        if drained:
+            # Cleanup is best effort; it must never fail the query that triggered it.
+            try:
+                collect_garbage()
+            except Exception as e:
+                print(f"[WARN] Index garbage collection failed: {e}")
+
+
+class LiveRetriever(BaseRetriever):
+    """Retriever that always searches the generation currently held by a LiveIndex."""
+
+    live_index: Any
+    k: int = 3
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        with self.live_index.acquire() as vectorstore:
+            return vectorstore.similarity_search(query, k=self.k)
+
+
+class BackgroundIndexer(threading.Thread):
+    """Polls data/ and builds a new generation off to the side whenever the PDFs change."""
+
+    def __init__(self, live_index, interval=WATCH_INTERVAL):
+        super().__init__(name="background-indexer", daemon=True)
+        self.live_index = live_index
+        self.interval = interval
+
+    def _snapshot(self):
+        # Sizes and mtimes are cheap to stat; content hashes are only computed by the build.
+        snapshot = []
+        for file in list_pdfs():
+            stat = os.stat(os.path.join(PDF_FOLDER, file))
+            snapshot.append((file, stat.st_size, stat.st_mtime_ns))
+        return snapshot
+
+    def run(self):
+        last = None
+        while True:
+            try:
+                snapshot = self._snapshot()
+                if snapshot != last:
+                    build_generation()
+                    last = snapshot
+                # Also picks up generations published by other processes.
+                self.live_index.refresh()
+            except Exception as e:
+                print(f"[WARN] Background re-index failed: {e}")
+            time.sleep(self.interval)
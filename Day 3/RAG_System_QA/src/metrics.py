@@ -0,0 +1,13 @@
+import json
+import os
+import time
+
+METRICS_LOG_PATH = os.getenv("RAG_METRICS_LOG", "logs/query_metrics.jsonl")
+
+
+def log_query_metrics(record, path=METRICS_LOG_PATH):
+    """Append one query's latency record as a JSON line."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    record = {"timestamp": time.time(), **record}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
@@ -1,11 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from langchain.chains import RetrievalQA
 from langchain_google_genai import GoogleGenerativeAI
-from .retriever import load_vectorstore
+from .answer_cache import AnswerCache
+from .context import pack_context
+from .preprocess import embeddings
+from .live_index import WATCH_INTERVAL, BackgroundIndexer, LiveIndex, LiveRetriever
+from .retriever import build_generation, current_generation
 
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
+# Chunks retrieved per question; context packing then trims them to the token budget.
+TOP_K = int(os.getenv("RAG_TOP_K", "6"))
+# Concurrent Gemini calls made by answer_questions
+QA_CONCURRENCY = int(os.getenv("RAG_QA_CONCURRENCY", "8"))
+
 # Load LLM
 llm = GoogleGenerativeAI(
     model="gemini-2.0-flash",
@@ -13,9 +24,12 @@ llm = GoogleGenerativeAI(
     temperature=0.2
 )
 
-# Load retriever from vector store
-vectorstore = load_vectorstore()
-retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
+# Load retriever from vector store. Only the very first run builds the index before serving;
+# afterwards the background indexer picks up changes in data/ and swaps new generations in.
+if current_generation() is None:
+    build_generation()
+live_index = LiveIndex()
+retriever = LiveRetriever(live_index=live_index, k=TOP_K)
 
 # Create QA chain
 qa_chain = RetrievalQA.from_chain_type(
@@ -24,7 +38,90 @@ qa_chain = RetrievalQA.from_chain_type(
     return_source_documents=True
 )
 
+# Semantic answer cache, invalidated whenever the index version changes
+answer_cache = AnswerCache(index_version=live_index.version)
+live_index.listeners.append(lambda generation: answer_cache.set_index_version(generation.version))
+
+if WATCH_INTERVAL:
+    BackgroundIndexer(live_index).start()
+
+def _pack(question, docs):
+    context, sources, stats = pack_context(docs)
+    print(f"[INFO] Context for {question!r}: {stats['context_tokens']} tokens sent vs {stats['baseline_tokens']} unpacked "
+          f"({stats['saved_tokens']} saved; {stats['retrieved_chunks']} chunks, {stats['retrieved_tokens']} tokens -> {stats['context_blocks']} blocks)")
+    return context, sources, stats
+
 # Define answer function
 def answer_question(question):
-    result = qa_chain({"query": question})
-    return result['result'], result['source_documents']
\ No newline at end of file
+    vector = embeddings.embed_query(question)
+    cached = answer_cache.lookup(vector)
+    if cached is not None:
+        return cached
+    with live_index.acquire() as vectorstore:
+        docs = vectorstore.similarity_search_by_vector(vector, k=TOP_K)
+    context, sources, _ = _pack(question, docs)
+    answer = qa_chain.combine_documents_chain.run(input_documents=context, question=question)
+    answer_cache.store(question, vector, answer, sources)
+    return answer, sources
+
+def _search_batch(vectors, k):
+    # One multi-query FAISS search; chunks shared by several questions are fetched once.
+    with live_index.acquire() as vectorstore:
+        _, rows = vectorstore.index.search(np.asarray(vectors, dtype=np.float32), k)
+        ids = [[vectorstore.index_to_docstore_id[int(row)] for row in hits if row != -1] for hits in rows]
+        docs = {doc_id: vectorstore.docstore.search(doc_id) for doc_id in {doc_id for hits in ids for doc_id in hits}}
+    return [[docs[doc_id] for doc_id in hits] for hits in ids]
+
+def answer_questions(questions, k=TOP_K, max_concurrency=QA_CONCURRENCY):
+    """Answer many questions with one embedding batch, one FAISS search and concurrent LLM calls.
+
+    Results are returned in input order as (answer, source_documents) tuples.
+    """
+    questions = list(questions)
+    if not questions:
+        return []
+    vectors = embeddings.embed_queries(questions)
+    results = [answer_cache.lookup(vector) for vector in vectors]
+    pending = [i for i, cached in enumerate(results) if cached is None]
+    if not pending:
+        return results
+
+    packed = [_pack(questions[i], docs) for i, docs in zip(pending, _search_batch([vectors[i] for i in pending], k))]
+    sources = [docs for _, docs, _ in packed]
+    combine = qa_chain.combine_documents_chain
+
+    def run(item):
+        i, (context, _, _) = item
+        return combine.run(input_documents=context, question=questions[i])
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        answers = list(pool.map(run, zip(pending, packed)))
+    for i, answer, docs in zip(pending, answers, sources):
+        answer_cache.store(questions[i], vectors[i], answer, docs, save=False)
+        results[i] = (answer, docs)
+    answer_cache.flush()
+    return results
+
+def stream_answer(question, k=TOP_K):
+    """Yield ("sources", docs) and ("context", packing stats) as soon as retrieval finishes,
+    then ("token", text) chunks from Gemini. Cached answers skip the "context" event."""
+    vector = embeddings.embed_query(question)
+    cached = answer_cache.lookup(vector)
+    if cached is not None:
+        answer, docs = cached
+        yield "sources", docs
+        yield "token", answer
+        return
+    with live_index.acquire() as vectorstore:
+        docs = vectorstore.similarity_search_by_vector(vector, k=k)
+    context, docs, stats = _pack(question, docs)
+    yield "sources", docs
+    yield "context", stats
+    # Same prompt the RetrievalQA "stuff" chain would build, but streamed from the LLM.
+    combine = qa_chain.combine_documents_chain
+    prompt = combine.llm_chain.prompt.format(**combine._get_inputs(context, question=question))
+    answer = ""
+    for token in llm.stream(prompt):
+        answer += token
+        yield "token", token
+    answer_cache.store(question, vector, answer, docs)
@@ -1,26 +1,150 @@
 from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.embeddings import HuggingFaceEmbeddings
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pypdf import PdfReader
+import hashlib
 import os
+import time
+from .dedup import deduplicate_chunks
+from .embedding_cache import CachedEmbeddings
 
 PDF_FOLDER = "data"
 VECTOR_DB_PATH = "vectorstore/index"
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
+# Large PDFs are split into page ranges of this size so one paper can use several workers.
+PAGES_PER_TASK = 16
+INGEST_WORKERS = int(os.getenv("RAG_INGEST_WORKERS", os.cpu_count() or 1))
+# Estimated Jaccard similarity above which a chunk counts as a near-duplicate; 0 disables dedup.
+DEDUP_THRESHOLD = float(os.getenv("RAG_DEDUP_THRESHOLD", "0.85"))
+
+
+def list_pdfs(folder=PDF_FOLDER):
+    return sorted(file for file in os.listdir(folder) if file.endswith(".pdf"))
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_pdf(path):
+    loader = PyPDFLoader(path)
+    return loader.load()
 
 def load_documents():
     all_docs = []
-    for file in os.listdir(PDF_FOLDER):
-        if file.endswith(".pdf"):
-            loader  = PyPDFLoader(os.path.join(PDF_FOLDER,file))
-            documents = loader.load()
-            all_docs.extend(documents)
+    for file in list_pdfs():
+        all_docs.extend(load_pdf(os.path.join(PDF_FOLDER, file)))
     return all_docs
 
-def get_chunked_docs():
-    docs = load_documents()
+def chunk_documents(docs):
     splitter = RecursiveCharacterTextSplitter(chunk_size=1000,chunk_overlap=200)
-    chunked_docs = splitter.split_documents(docs)
+    return splitter.split_documents(docs)
+
+def _load_and_chunk_pages(path, start, stop, dedup_threshold):
+    # Runs inside a worker process: parse one page range and split it right away,
+    # so only chunks (never whole documents) travel back to the parent.
+    # Repeated headers, footers and licence text are dropped here, within the page range.
+    reader = PdfReader(path)
+    pages = [
+        Document(page_content=reader.pages[i].extract_text() or "", metadata={"source": path, "page": i})
+        for i in range(start, stop)
+    ]
+    chunks = chunk_documents(pages)
+    dropped = dropped_chars = 0
+    if dedup_threshold:
+        chunks, dropped, dropped_chars = deduplicate_chunks(chunks, dedup_threshold)
+    return path, start, len(pages), chunks, dropped, dropped_chars
+
+def _page_ranges(paths, pages_per_task):
+    for path in paths:
+        page_count = len(PdfReader(path).pages)
+        for start in range(0, page_count, pages_per_task):
+            yield path, start, min(start + pages_per_task, page_count)
+
+
+class IngestStats:
+    def __init__(self):
+        self.pages = 0
+        self.chunks = 0
+        self.duplicates = 0
+        self.duplicate_chars = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def report(self):
+        elapsed = max(self.elapsed, 1e-9)
+        print(
+            f"[INFO] Ingested {self.pages} pages / {self.chunks} chunks in {elapsed:.2f}s "
+            f"({self.pages / elapsed:.1f} pages/s, {self.chunks / elapsed:.1f} chunks/s)"
+        )
+        if self.duplicates:
+            total = self.chunks + self.duplicates
+            print(
+                f"[INFO] Dropped {self.duplicates} near-duplicate chunks ({100 * self.duplicates / total:.1f}% fewer vectors, "
+                f"{self.duplicate_chars / 1e6:.2f} MB less text to embed)"
+            )
+
+    def add(self, page_count, chunks, dropped, dropped_chars):
+        self.pages += page_count
+        self.chunks += len(chunks)
+        self.duplicates += dropped
+        self.duplicate_chars += dropped_chars
+
+
+def iter_chunks(paths, workers=INGEST_WORKERS, pages_per_task=PAGES_PER_TASK, max_pending=None, stats=None, dedup_threshold=DEDUP_THRESHOLD):
+    """Yield (path, start_page, chunks) per page range as workers finish them.
+
+    At most `max_pending` page ranges are in flight, so a slow consumer (the embedder)
+    throttles parsing instead of letting parsed chunks pile up in memory.
+    """
+    if not paths:
+        return
+    max_pending = max_pending or 2 * workers
+    stats = stats or IngestStats()
+    tasks = _page_ranges(paths, pages_per_task)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for task in tasks:
+            pending.add(pool.submit(_load_and_chunk_pages, *task, dedup_threshold))
+            if len(pending) < max_pending:
+                continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, start, page_count, chunks, *dropped = future.result()
+                stats.add(page_count, chunks, *dropped)
+                yield path, start, chunks
+        for future in wait(pending).done:
+            path, start, page_count, chunks, *dropped = future.result()
+            stats.add(page_count, chunks, *dropped)
+            yield path, start, chunks
+    stats.report()
+
+def iter_chunk_batches(paths, batch_size=256, **kwargs):
+    """Group streamed chunks into embedder-sized batches of (path, start_page, chunks) slices."""
+    batch, size = [], 0
+    for path, start, chunks in iter_chunks(paths, **kwargs):
+        batch.append((path, start, chunks))
+        size += len(chunks)
+        if size >= batch_size:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+def get_chunked_docs():
+    paths = [os.path.join(PDF_FOLDER, file) for file in list_pdfs()]
+    chunked_docs = []
+    for _, _, chunks in iter_chunks(paths):
+        chunked_docs.extend(chunks)
     return chunked_docs
 
 
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
\ No newline at end of file
+embeddings = CachedEmbeddings(HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL), EMBEDDING_MODEL)
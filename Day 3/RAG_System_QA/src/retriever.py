@@ -1,16 +1,326 @@
+import json
 import os
+import shutil
+import time
+import faiss
+from contextlib import contextmanager
 from langchain_community.vectorstores import FAISS
-from .preprocess import embeddings, get_chunked_docs
+from .docstore import DOCSTORE_DIR, LEGACY_SQLITE_FILE, ColumnarDocstore, RowIdMap, read_sqlite_docstore
+from .index_factory import INDEX_CONFIG_FILE, LEGACY_CONFIG, apply_search_params, build_index, empty_index, load_index_config, outgrown, save_index_config, training_size
+from .preprocess import PDF_FOLDER, embeddings, list_pdfs, file_hash, iter_chunk_batches
 
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, so garbage collection falls back to KEEP_GENERATIONS.
+    fcntl = None
+
+# Each index build is written to its own generation directory (vectorstore/index/gen-000042)
+# and published by atomically replacing the CURRENT pointer file. Readers keep using the
+# generation they opened until they switch, so a rebuild never interrupts queries.
 VECTOR_DB_PATH = "vectorstore/index"
+CURRENT_PATH = os.path.join(VECTOR_DB_PATH, "CURRENT")
+BUILD_LOCK_PATH = os.path.join(VECTOR_DB_PATH, "build.lock")
+INDEX_FILE = "index.faiss"
+MANIFEST_FILE = "manifest.json"
+GENERATION_LOCK_FILE = ".lock"
+KEEP_GENERATIONS = 2
+
+# "memory" loads a writable copy of the index into each process.
+# "mmap" maps index.faiss and the docstore columns read-only, so several
+# server processes share one copy through the OS page cache.
+INDEX_MODE = os.getenv("RAG_INDEX_MODE", "memory")
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def current_generation():
+    if not os.path.exists(CURRENT_PATH):
+        return None
+    with open(CURRENT_PATH, "r", encoding="utf-8") as f:
+        return f.read().strip() or None
+
+def generation_path(name=None):
+    name = name or current_generation()
+    return os.path.join(VECTOR_DB_PATH, name) if name else None
+
+def load_manifest(path=None):
+    # Manifest maps each PDF to the content hash it was indexed at and the chunk IDs it produced.
+    path = path or generation_path()
+    if path is None or not os.path.exists(os.path.join(path, MANIFEST_FILE)):
+        return {"version": 0, "files": {}}
+    with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest, path):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+def scan_corpus():
+    return {file: file_hash(os.path.join(PDF_FOLDER, file)) for file in list_pdfs()}
+
+def diff_corpus(manifest, corpus):
+    indexed = manifest["files"]
+    added = [file for file in corpus if file not in indexed]
+    modified = [file for file in corpus if file in indexed and indexed[file]["hash"] != corpus[file]]
+    deleted = [file for file in indexed if file not in corpus]
+    return added, modified, deleted
+
+def chunk_ids(file, digest, start, chunks):
+    return [f"{file}#{digest[:12]}#{start}-{i}" for i in range(len(chunks))]
+
+def create_vectorstore(docs, ids, config):
+    """Build a new vectorstore of the configured index type, training it on `docs` if needed."""
+    texts = [doc.page_content for doc in docs]
+    vectors = embeddings.embed_documents(texts)
+    index, config = build_index(config, vectors)
+    vectorstore = FAISS(embeddings, index, ColumnarDocstore(), {})
+    vectorstore.add_embeddings(zip(texts, vectors), metadatas=[doc.metadata for doc in docs], ids=ids)
+    vectorstore.index_config = config
+    return vectorstore
+
+def empty_vectorstore(config, dim):
+    vectorstore = FAISS(embeddings, empty_index(config, dim), ColumnarDocstore(), {})
+    vectorstore.index_config = config
+    return vectorstore
+
+def rebuild_vectorstore(vectorstore, config=None, drop_ids=()):
+    """Re-create the index from the docstore; vectors come from the embedding cache.
+
+    Parameters are re-fitted from the requested ones, not the ones the old index was
+    shrunk to. Returns None if no chunks are left.
+    """
+    drop = set(drop_ids)
+    ids = [doc_id for _, doc_id in sorted(vectorstore.index_to_docstore_id.items()) if doc_id not in drop]
+    if not ids:
+        return None
+    docs = [vectorstore.docstore.search(doc_id) for doc_id in ids]
+    return create_vectorstore(docs, ids, config or vectorstore.index_config)
+
+def removes_in_place(vectorstore):
+    # FAISS.delete renumbers the remaining rows 0..n-1, which only matches flat indexes:
+    # they compact on remove_ids. IVF lists keep the original labels (so later adds reuse
+    # labels still in use) and HNSW graphs can't remove at all, so those are rebuilt
+    # from the embedding cache instead.
+    return getattr(vectorstore, "index_config", LEGACY_CONFIG)["type"] == "flat"
+
+def update_vectorstore(vectorstore, manifest, config):
+    """Re-embed only added/modified PDFs and drop chunks of deleted ones, updating `manifest` in place.
+
+    Returns (vectorstore, changed). `config` is used when a new index has to be created.
+    """
+    corpus = scan_corpus()
+    added, modified, deleted = diff_corpus(manifest, corpus)
+    if not (added or modified or deleted):
+        return vectorstore, False
 
-def load_vectorstore():
-    faiss_index_path = os.path.join(VECTOR_DB_PATH, "index.faiss")
-    if os.path.exists(faiss_index_path):
-        return FAISS.load_local(VECTOR_DB_PATH, embeddings, allow_dangerous_deserialization=True)
+    print(f"[INFO] Updating FAISS index: {len(added)} added, {len(modified)} modified, {len(deleted)} deleted PDFs")
+    dim = vectorstore.index.d if vectorstore is not None else None
+    stale_ids = []
+    for file in modified + deleted:
+        stale_ids.extend(manifest["files"].pop(file)["chunk_ids"])
+    if stale_ids and vectorstore is not None:
+        if removes_in_place(vectorstore):
+            vectorstore.delete(stale_ids)
+        else:
+            vectorstore = rebuild_vectorstore(vectorstore, drop_ids=stale_ids)
+
+    pending = added + modified
+    for file in pending:
+        manifest["files"][file] = {"hash": corpus[file], "chunk_ids": []}
+    # Chunks stream in from the ingestion workers and are embedded batch by batch.
+    # A new index is only created once enough chunks are buffered to train it.
+    buffered_docs, buffered_ids = [], []
+    for batch in iter_chunk_batches([os.path.join(PDF_FOLDER, file) for file in pending]):
+        docs, ids = [], []
+        for path, start, chunks in batch:
+            file = os.path.basename(path)
+            batch_ids = chunk_ids(file, corpus[file], start, chunks)
+            manifest["files"][file]["chunk_ids"].extend(batch_ids)
+            docs.extend(chunks)
+            ids.extend(batch_ids)
+        if not docs:
+            continue
+        if vectorstore is not None:
+            vectorstore.add_documents(docs, ids=ids)
+            continue
+        buffered_docs.extend(docs)
+        buffered_ids.extend(ids)
+        if len(buffered_docs) >= training_size(config):
+            vectorstore = create_vectorstore(buffered_docs, buffered_ids, config)
+            buffered_docs, buffered_ids = [], []
+    if buffered_docs:
+        vectorstore = create_vectorstore(buffered_docs, buffered_ids, config)
+    if vectorstore is None:
+        # Every PDF is gone; serve an empty index rather than a generation with no index.faiss.
+        vectorstore = empty_vectorstore(config, dim or len(embeddings.embed_query("")))
+    elif outgrown(vectorstore.index_config, vectorstore.index.ntotal, vectorstore.index.d):
+        print("[INFO] Corpus has outgrown the index parameters it was trained with; rebuilding...")
+        vectorstore = rebuild_vectorstore(vectorstore)
+    if pending:
+        embeddings.report()
+    return vectorstore, True
+
+def save_vectorstore(vectorstore, path):
+    os.makedirs(path, exist_ok=True)
+    faiss.write_index(vectorstore.index, os.path.join(path, INDEX_FILE))
+    save_index_config(path, getattr(vectorstore, "index_config", LEGACY_CONFIG))
+    docstore = vectorstore.docstore
+    if not isinstance(docstore, ColumnarDocstore):
+        docstore = ColumnarDocstore()
+        docstore.add({doc_id: vectorstore.docstore.search(doc_id) for doc_id in vectorstore.index_to_docstore_id.values()})
+    docstore.write(os.path.join(path, DOCSTORE_DIR), vectorstore.index_to_docstore_id)
+
+def open_vectorstore(path, mmap=False, writable=False):
+    """Open a generation; only pass `writable` for a copy that will be added to or deleted from."""
+    if not os.path.exists(os.path.join(path, INDEX_FILE)):
+        return None
+    docstore = ColumnarDocstore(os.path.join(path, DOCSTORE_DIR))
+    config = load_index_config(path, default=LEGACY_CONFIG)
+    if writable:
+        # FAISS.add/delete update the mapping in place, so this copy needs a real dict.
+        vectorstore = FAISS(embeddings, faiss.read_index(os.path.join(path, INDEX_FILE)), docstore, dict(RowIdMap(docstore)))
+    else:
+        index = faiss.read_index(os.path.join(path, INDEX_FILE), MMAP_FLAGS) if mmap else faiss.read_index(os.path.join(path, INDEX_FILE))
+        vectorstore = FAISS(embeddings, index, docstore, RowIdMap(docstore))
+    apply_search_params(vectorstore.index, config)
+    vectorstore.index_config = config
+    return vectorstore
+
+@contextmanager
+def _file_lock(path, mode):
+    with open(path, "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, mode)
+        yield f
+
+def hold_generation(name):
+    """Take a shared lock that keeps a generation from being garbage-collected; close the file to release it."""
+    f = open(os.path.join(generation_path(name), GENERATION_LOCK_FILE), "a+")
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_SH)
+    return f
+
+def collect_garbage():
+    """Delete retired generations that no process has open any more."""
+    current = current_generation()
+    names = sorted(name for name in os.listdir(VECTOR_DB_PATH) if name.startswith("gen-"))
+    retired = [name for name in names if name != current and not name.endswith(".tmp")]
+    if fcntl is None:
+        retired = retired[:max(0, len(retired) - (KEEP_GENERATIONS - 1))]
+    for name in retired:
+        path = generation_path(name)
+        try:
+            f = open(os.path.join(path, GENERATION_LOCK_FILE), "a+")
+        except FileNotFoundError:
+            continue  # another process collected it first
+        with f:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue
+            shutil.rmtree(path, ignore_errors=True)
+
+def publish_vectorstore(vectorstore, manifest):
+    """Write `vectorstore` as a new generation and atomically make it the current one."""
+    name = f"gen-{manifest['version']:06d}"
+    path = generation_path(name)
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    if vectorstore is not None:
+        save_vectorstore(vectorstore, tmp_path)
+    save_manifest(manifest, tmp_path)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    with open(CURRENT_PATH + ".tmp", "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(CURRENT_PATH + ".tmp", CURRENT_PATH)
+    collect_garbage()
+    return name
+
+def build_generation():
+    """Bring the index up to date with data/ in a new generation. Returns its name, or None if nothing changed.
+
+    The live generation is only read, so it keeps serving queries while this runs.
+    Builds are serialised across threads and processes by an exclusive file lock.
+    """
+    os.makedirs(VECTOR_DB_PATH, exist_ok=True)
+    with _file_lock(BUILD_LOCK_PATH, fcntl.LOCK_EX if fcntl else None):
+        _migrate_legacy_layout()
+        current = current_generation()
+        if current is None:
+            print("[INFO] Vectorstore missing. Creating new FAISS index...")
+            vectorstore, manifest, config = None, {"version": 0, "files": {}}, load_index_config(VECTOR_DB_PATH)
+        else:
+            lock = hold_generation(current)
+            vectorstore = open_vectorstore(generation_path(current), writable=True)
+            manifest = load_manifest(generation_path(current))
+            config = load_index_config(generation_path(current), default=LEGACY_CONFIG)
+            if vectorstore is not None and not vectorstore.index.ntotal:
+                # An empty generation's index may be a flat stand-in; train a real one from scratch.
+                vectorstore = None
+        try:
+            vectorstore, changed = update_vectorstore(vectorstore, manifest, config)
+            if not changed and current is not None:
+                return None
+            manifest["version"] += 1
+            return publish_vectorstore(vectorstore, manifest)
+        finally:
+            if current is not None:
+                lock.close()
+
+def publish_next_generation(vectorstore, base):
+    """Publish `vectorstore`, derived from generation `base`, as the next generation.
+
+    Takes the build lock like build_generation. Returns the new generation's name, or None
+    (publishing nothing) if another build has moved CURRENT on from `base` meanwhile.
+    """
+    with _file_lock(BUILD_LOCK_PATH, fcntl.LOCK_EX if fcntl else None):
+        if current_generation() != base:
+            return None
+        manifest = load_manifest(generation_path(base))
+        manifest["version"] += 1
+        return publish_vectorstore(vectorstore, manifest)
+
+def _migrate_legacy_layout():
+    # Indexes written before generations lived directly in vectorstore/index, with the
+    # docstore in index.pkl (FAISS.save_local), docstore.sqlite or docstore/.
+    root = VECTOR_DB_PATH
+    if current_generation() is not None or not os.path.exists(os.path.join(root, INDEX_FILE)):
+        return
+    if not os.path.exists(os.path.join(root, MANIFEST_FILE)):
+        # Without a manifest the chunks can't be matched to PDFs; the index is rebuilt instead.
+        return
+    pickle_path = os.path.join(root, "index.pkl")
+    sqlite_path = os.path.join(root, LEGACY_SQLITE_FILE)
+    if os.path.exists(os.path.join(root, DOCSTORE_DIR)):
+        vectorstore = open_vectorstore(root)
+    elif os.path.exists(pickle_path):
+        print("[INFO] Converting pickled docstore to columnar format...")
+        vectorstore = FAISS.load_local(root, embeddings, allow_dangerous_deserialization=True)
+    elif os.path.exists(sqlite_path):
+        print("[INFO] Converting SQLite docstore to columnar format...")
+        docstore, index_to_docstore_id = read_sqlite_docstore(sqlite_path)
+        vectorstore = FAISS(embeddings, faiss.read_index(os.path.join(root, INDEX_FILE)), docstore, index_to_docstore_id)
     else:
-        print("[INFO] Vectorstore missing. Creating new FAISS index...")
-        docs = get_chunked_docs()
-        vectorstore = FAISS.from_documents(docs, embeddings)
-        vectorstore.save_local(VECTOR_DB_PATH)
-        return vectorstore
\ No newline at end of file
+        return
+    publish_vectorstore(vectorstore, load_manifest(root))
+    for name in (INDEX_FILE, MANIFEST_FILE, INDEX_CONFIG_FILE, "index.pkl", LEGACY_SQLITE_FILE):
+        if os.path.exists(os.path.join(root, name)):
+            os.remove(os.path.join(root, name))
+    shutil.rmtree(os.path.join(root, DOCSTORE_DIR), ignore_errors=True)
+
+def load_vectorstore(update=True, mode=INDEX_MODE):
+    """Open the current generation, first bringing it up to date with data/ if `update` is set."""
+    started = time.perf_counter()
+    if update or current_generation() is None:
+        build_generation()
+    vectorstore = open_vectorstore(generation_path(), mmap=mode == "mmap")
+    print(f"[INFO] Vectorstore ready in {time.perf_counter() - started:.3f}s (mode={mode})")
+    return vectorstore
+
+
+if __name__ == "__main__":
+    # On-demand refresh: python -m src.retriever
+    build_generation()
+    print(f"[INFO] FAISS index at version {load_manifest()['version']}.")
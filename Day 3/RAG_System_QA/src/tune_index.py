@@ -0,0 +1,127 @@
+"""Pick the fastest index settings that still reach a target recall@k.
+
+A sample of indexed chunks is held out and used as queries. Exact search over the
+remaining vectors gives the ground truth, and every candidate index / search parameter
+is scored by recall@k and mean single-query latency against it.
+
+    python -m src.tune_index --type ivf_flat --target-recall 0.95 --k 10 --apply
+"""
+import argparse
+import math
+import time
+
+import faiss
+import numpy as np
+
+from .index_factory import BUILD_KEYS, DEFAULT_CONFIG, INDEX_TYPES, apply_search_params, build_index
+from .preprocess import embeddings
+from .retriever import build_generation, current_generation, generation_path, open_vectorstore, publish_next_generation, rebuild_vectorstore
+
+
+def candidate_configs(index_type, n):
+    base = dict(DEFAULT_CONFIG, type=index_type, compression="none")
+    root = max(1, int(math.sqrt(n)))
+    if index_type == "flat":
+        return [base, dict(base, compression="sq8")]
+    if index_type == "ivf_flat":
+        return [dict(base, nlist=nlist, compression=c) for nlist in (root, 2 * root, 4 * root) for c in ("none", "sq8")]
+    if index_type == "ivf_pq":
+        return [dict(base, nlist=nlist) for nlist in (root, 2 * root, 4 * root)]
+    return [dict(base, hnsw_m=m, compression=c) for m in (16, 32) for c in ("none", "sq8")]
+
+def describe(config):
+    params = {
+        "ivf_flat": ("nlist", "nprobe"),
+        "ivf_pq": ("nlist", "pq_m", "pq_nbits", "nprobe"),
+        "hnsw": ("hnsw_m", "ef_search"),
+    }.get(config["type"], ())
+    return " ".join([config["type"], config["compression"]] + [f"{key}={config[key]}" for key in params])
+
+def search_sweep(config):
+    if config["type"] in ("ivf_flat", "ivf_pq"):
+        # A swept nprobe is chosen on purpose, so a later re-fit must not restore the requested one.
+        requested = {key: value for key, value in config.get("requested", {}).items() if key != "nprobe"}
+        return [dict(config, nprobe=p, requested=requested) for p in (1, 2, 4, 8, 16, 32, 64, 128, 256) if p <= config["nlist"]]
+    if config["type"] == "hnsw":
+        return [dict(config, ef_search=ef) for ef in (16, 32, 64, 128, 256, 512)]
+    return [config]
+
+def evaluate(index, config, queries, truth, k):
+    apply_search_params(index, config)
+    started = time.perf_counter()
+    hits = 0
+    for i, query in enumerate(queries):
+        _, rows = index.search(query[None, :], k)
+        hits += len(set(rows[0].tolist()) & set(truth[i].tolist()))
+    latency_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    return hits / (k * len(queries)), latency_ms
+
+def tune(vectors, index_types, k, target_recall, queries, seed):
+    rng = np.random.default_rng(seed)
+    held_out = np.zeros(len(vectors), dtype=bool)
+    held_out[rng.choice(len(vectors), size=min(queries, len(vectors) // 10 or 1), replace=False)] = True
+    base, query_vectors = vectors[~held_out], vectors[held_out]
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(base)
+    _, truth = exact.search(query_vectors, k)
+
+    results, seen = [], set()
+    for index_type in index_types:
+        for build in candidate_configs(index_type, len(base)):
+            index, build = build_index(build, base)
+            # Small corpora shrink several candidates to the same parameters.
+            key = tuple(build[name] for name in BUILD_KEYS)
+            if key in seen:
+                continue
+            seen.add(key)
+            index.add(base)
+            for config in search_sweep(build):
+                recall, latency_ms = evaluate(index, config, query_vectors, truth, k)
+                results.append({"config": config, "recall": round(recall, 4), "latency_ms": round(latency_ms, 4)})
+                print(f"[INFO] {describe(config)}: recall@{k}={recall:.3f} {latency_ms:.3f} ms/query")
+    passing = [r for r in results if r["recall"] >= target_recall]
+    if passing:
+        return min(passing, key=lambda r: r["latency_ms"])
+    print(f"[WARN] No setting reached recall@{k} >= {target_recall}; using the most accurate one.")
+    return max(results, key=lambda r: (r["recall"], -r["latency_ms"]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the FAISS index type and search parameters for a target recall")
+    parser.add_argument("--type", choices=INDEX_TYPES + ("all",), default="all")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--queries", type=int, default=200, help="held-out chunks used as queries")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--apply", action="store_true", help="rebuild the index if the chosen build parameters differ")
+    args = parser.parse_args()
+
+    base = current_generation() or build_generation()
+    vectorstore = open_vectorstore(generation_path(base))
+    ids = [doc_id for _, doc_id in sorted(vectorstore.index_to_docstore_id.items())]
+    # Vectors come from the embedding cache, so this doesn't re-run the model.
+    vectors = np.asarray(embeddings.embed_documents([vectorstore.docstore.search(doc_id).page_content for doc_id in ids]), dtype=np.float32)
+    index_types = INDEX_TYPES if args.type == "all" else (args.type,)
+    best = tune(vectors, index_types, args.k, args.target_recall, args.queries, args.seed)
+    chosen = dict(best["config"], tuning={"k": args.k, "target_recall": args.target_recall, "recall": best["recall"], "latency_ms": best["latency_ms"]})
+    print(f"[INFO] Chosen: {describe(chosen)} (recall@{args.k}={best['recall']}, {best['latency_ms']} ms/query)")
+
+    current = vectorstore.index_config
+    if all(current.get(key) == chosen[key] for key in BUILD_KEYS):
+        # Same index, different search parameters: republish it with the new index_config.json.
+        vectorstore.index_config = chosen
+    elif args.apply:
+        vectorstore = rebuild_vectorstore(vectorstore, config=chosen)
+        vectorstore.index_config = dict(vectorstore.index_config, tuning=chosen["tuning"])
+    else:
+        print("[INFO] The chosen setting needs a different index; re-run with --apply to rebuild it.")
+        return
+    name = publish_next_generation(vectorstore, base)
+    if name is None:
+        print(f"[WARN] The index was rebuilt while tuning; {base} is no longer current, so nothing was published. Re-run the tuner.")
+        return
+    print(f"[INFO] Published {name} with the chosen parameters.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import time
 import fitz  # PyMuPDF
 from PIL import Image
 from google.generativeai import GenerativeModel
@@ -5,6 +7,7 @@ from dotenv import load_dotenv
 import os
 import tempfile
 import google.generativeai as genai
+from utils import ocr_utils
 
 load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
@@ -12,16 +15,43 @@ genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 text_model = GenerativeModel("gemini-1.5-flash")
 vision_model = GenerativeModel("gemini-1.5-flash")
 
+# Files extracted at once, and seconds allowed for each file's extraction (also the Gemini vision call timeout).
+EXTRACT_CONCURRENCY = int(os.getenv("EVIDENCE_CONCURRENCY", "4"))
+FILE_TIMEOUT = float(os.getenv("EVIDENCE_FILE_TIMEOUT", "60"))
+
+# Local Tesseract text is used when its mean word confidence (0-100) and the number of
+# ticket fields it covers (event name, date, ticket ID) reach these thresholds.
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "70"))
+OCR_MIN_FIELDS = int(os.getenv("OCR_MIN_FIELDS", "2"))
+# Assumed Gemini vision latency for the savings estimate until a real call has been timed.
+GEMINI_VISION_ESTIMATE_S = float(os.getenv("GEMINI_VISION_ESTIMATE_S", "3.0"))
+OCR_AVAILABLE = ocr_utils.is_available()
+image_tier_stats = ocr_utils.TierStats()
+
 def extract_text_from_pdf(file):
     doc = fitz.open(stream=file.read(), filetype="pdf")
     return "".join([page.get_text() for page in doc])
 
 def extract_text_from_image(file):
     image = Image.open(file)
+    ocr_seconds = 0.0
+    if OCR_AVAILABLE:
+        started = time.perf_counter()
+        text, confidence = ocr_utils.ocr_image(image)
+        ocr_seconds = time.perf_counter() - started
+        if confidence >= OCR_MIN_CONFIDENCE and len(ocr_utils.field_coverage(text)) >= OCR_MIN_FIELDS:
+            image_tier_stats.record("local", ocr_seconds=ocr_seconds)
+            return text
+
+    started = time.perf_counter()
     prompt = "Extract the event name, date, location, and ticket or registration info from this image."
-    response = vision_model.generate_content([prompt, image])
+    response = vision_model.generate_content([prompt, image], request_options={"timeout": FILE_TIMEOUT})
+    image_tier_stats.record("gemini", ocr_seconds=ocr_seconds, gemini_seconds=time.perf_counter() - started)
     return response.text
 
+def image_tier_report():
+    return image_tier_stats.report(GEMINI_VISION_ESTIMATE_S)
+
 def parse_event_info(raw_text):
     prompt = f"""
     From the following text, extract and return these fields in JSON:
@@ -35,16 +65,58 @@ def parse_event_info(raw_text):
     """
     return text_model.generate_content(prompt).text
 
-def extract_evidence(files):
-    all_raw_text = ""
-    for file in files:
-        filename = file.name.lower()
-        if filename.endswith(".pdf"):
-            all_raw_text += extract_text_from_pdf(file) + "\n"
-        elif filename.endswith((".jpg", ".jpeg", ".png")):
-            all_raw_text += extract_text_from_image(file) + "\n"
-        else:
-            all_raw_text += file.read().decode("utf-8") + "\n"
+def extract_text_from_file(file):
+    filename = file.name.lower()
+    if filename.endswith(".pdf"):
+        return extract_text_from_pdf(file)
+    elif filename.endswith((".jpg", ".jpeg", ".png")):
+        return extract_text_from_image(file)
+    else:
+        return file.read().decode("utf-8")
+
+def _safe_extract(file):
+    try:
+        return extract_text_from_file(file), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def _timed_extract(i, file, started):
+    started[i] = time.monotonic()
+    return _safe_extract(file)
+
+def extract_evidence(files, max_workers=EXTRACT_CONCURRENCY):
+    """Extract text from all files concurrently and parse the event info from it.
+
+    Returns (parsed_response, failures); failures lists {"file", "error"} for files that
+    could not be read or took longer than FILE_TIMEOUT, while the rest are still parsed
+    in upload order.
+    """
+    files = list(files)
+    results = [None] * len(files)
+    started = {}
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(files))))
+    futures = {pool.submit(_timed_extract, i, file, started): i for i, file in enumerate(files)}
+    pending = set(futures)
+    try:
+        while pending:
+            # Each file's clock starts when a worker picks it up, not while it waits in the queue.
+            deadlines = [started[futures[future]] + FILE_TIMEOUT for future in pending if futures[future] in started]
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else FILE_TIMEOUT
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[futures[future]] = future.result()
+            now = time.monotonic()
+            for future in [future for future in pending if now - started.get(futures[future], now) >= FILE_TIMEOUT]:
+                pending.discard(future)
+                results[futures[future]] = None, f"TimeoutError: extraction took longer than {FILE_TIMEOUT:g}s"
+    finally:
+        # A timed-out extraction can't be interrupted; let it finish in the background.
+        pool.shutdown(wait=False, cancel_futures=True)
 
+    texts = [text for text, error in results if error is None]
+    failures = [{"file": file.name, "error": error} for file, (_, error) in zip(files, results) if error is not None]
+    if not texts:
+        return "{}", failures
+    all_raw_text = "".join(text + "\n" for text in texts)
     parsed_response = parse_event_info(all_raw_text)
-    return parsed_response
+    return parsed_response, failures
@@ -1,7 +1,7 @@
 from langchain.chains import RetrievalQA
 from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
-from utils.rag_utils import create_vectorstore_from_pdf
+from utils.rag_utils import get_session_vectorstore
 import os
 import google.generativeai as genai
 
@@ -9,7 +9,7 @@ load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 def align_sessions(event_name, user_learnings):
-    vectorstore = create_vectorstore_from_pdf("./data")
+    vectorstore = get_session_vectorstore("./data")
     retriever = vectorstore.as_retriever()
 
     qa = RetrievalQA.from_chain_type(
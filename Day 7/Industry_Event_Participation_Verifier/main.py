@@ -1,8 +1,9 @@
 import streamlit as st
-from agents.evidence_extractor import extract_evidence
+from agents.evidence_extractor import extract_evidence, image_tier_report
 from agents.participation_verifier import verify_participation
 from agents.learning_outcome_extractor import extract_learning
 from agents.session_alignment_agent import align_sessions
+from utils.stage_graph import Stage, run_stages
 
 st.set_page_config(page_title="Industry Event OKR Verifier", layout="centered")
 st.title("📊 Industry Event Participation Verifier")
@@ -13,34 +14,69 @@ user_notes = st.text_area("📝 Paste Your Learning Notes or Reflections")
 event_name = st.text_input("📌 Event Name (e.g., NASSCOM DevFest)")
 submit = st.button("🔍 Run Verification")
 
+# Learning extraction only needs the notes, so it runs alongside evidence extraction;
+# alignment waits for both and is skipped when participation is not verified.
+STAGES = [
+    Stage("evidence", extract_evidence, inputs=["files"]),
+    Stage("verified", lambda evidence: verify_participation(evidence[0]), inputs=["evidence"]),
+    Stage("learnings", extract_learning, inputs=["notes"]),
+    Stage("alignment", align_sessions, inputs=["event_name", "learnings", "verified"],
+          when=lambda event, learnings, verified: verified),
+]
+STAGE_LABELS = {
+    "evidence": "🔍 Extracting evidence...",
+    "verified": "🔍 Verifying participation...",
+    "learnings": "📖 Extracting learning outcomes...",
+    "alignment": "📚 Aligning with official sessions...",
+}
+
+def show_stage(name, value):
+    if name == "evidence":
+        evidence_json, failures = value
+        for failure in failures:
+            st.warning(f"⚠️ Could not extract {failure['file']}: {failure['error']}")
+        st.success("✅ Evidence extracted.")
+        st.json(evidence_json)
+        with st.expander("Image OCR tiers"):
+            st.json(image_tier_report())
+    elif name == "verified":
+        st.success(f"✅ Participation status: {'Verified' if value else 'Not Verified'}")
+    elif name == "learnings":
+        st.success("✅ Learning outcomes extracted.")
+        st.markdown(f"**🧠 Key Learnings:**\n\n{value}")
+    elif name == "alignment":
+        st.success("✅ Session alignment complete.")
+        st.markdown(f"**🎯 Session Alignment Result:**\n\n{value}")
+
 if submit:
     if not uploaded_files or not event_name:
         st.error("🚫 Please upload at least one file and enter the event name.")
     else:
-        with st.spinner("🔍 Extracting evidence..."):
-            evidence_json = extract_evidence(uploaded_files)
-        st.success("✅ Evidence extracted.")
-        st.json(evidence_json)
-
-        with st.spinner("🔍 Verifying participation..."):
-            verified = verify_participation(evidence_json)
-        st.success(f"✅ Participation status: {'Verified' if verified else 'Not Verified'}")
+        # One slot per stage keeps the page order fixed while results arrive in any order.
+        slots = {}
+        for stage in STAGES:
+            slots[stage.name] = st.empty()
+            slots[stage.name].info(STAGE_LABELS[stage.name])
 
-        with st.spinner("📖 Extracting learning outcomes..."):
-            learnings = extract_learning(user_notes)
-        st.success("✅ Learning outcomes extracted.")
-        st.markdown(f"**🧠 Key Learnings:**\n\n{learnings}")
-
-        with st.spinner("📚 Aligning with official sessions..."):
-            alignment = align_sessions(event_name, learnings)
-        st.success("✅ Session alignment complete.")
-        st.markdown(f"**🎯 Session Alignment Result:**\n\n{alignment}")
+        results = {}
+        inputs = {"files": uploaded_files, "notes": user_notes, "event_name": event_name}
+        for name, status, value in run_stages(STAGES, inputs):
+            with slots[name].container():
+                if status == "done":
+                    results[name] = value
+                    show_stage(name, value)
+                elif status == "failed":
+                    st.error(f"🚫 {STAGE_LABELS[name].rstrip('.')} failed: {value}")
+                elif name == "alignment" and results.get("verified") is False:
+                    st.info("⏭️ Session alignment skipped: participation not verified.")
+                else:
+                    st.info(f"⏭️ {STAGE_LABELS[name].rstrip('.')} skipped.")
 
         st.markdown("---")
         st.markdown("### 📋 Final Summary")
         st.json({
-            "Participation Verified": verified,
-            "Extracted Learnings": learnings,
-            "Session Alignment": alignment,
-            "Extracted Evidence": evidence_json
+            "Participation Verified": results.get("verified"),
+            "Extracted Learnings": results.get("learnings"),
+            "Session Alignment": results.get("alignment"),
+            "Extracted Evidence": results["evidence"][0] if "evidence" in results else None
         })
@@ -0,0 +1,79 @@
+import re
+import threading
+
+try:
+    import pytesseract
+except ImportError:  # OCR fast path is optional; images then always go to Gemini vision.
+    pytesseract = None
+
+# Patterns for the fields a ticket or registration screenshot should contain.
+FIELD_PATTERNS = {
+    "event_name": re.compile(r"\b(event|conference|summit|fest|devfest|meetup|hackathon|workshop|expo|webinar|bootcamp|symposium)\b", re.I),
+    "date": re.compile(
+        r"\b\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}\b"
+        r"|\b\d{4}-\d{2}-\d{2}\b"
+        r"|\b\d{1,2}(st|nd|rd|th)?\s+(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?,?\s+\d{4}\b"
+        r"|\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+\d{1,2}(st|nd|rd|th)?,?\s+\d{4}\b",
+        re.I,
+    ),
+    "ticket_id": re.compile(r"\b(ticket|registration|order|booking|confirmation|reg)\b\.?\s*(id|no|number|#|code)?\.?\s*[:#-]?\s*[A-Z0-9][A-Z0-9-]{3,}", re.I),
+}
+
+
+def is_available():
+    if pytesseract is None:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception:
+        return False
+    return True
+
+def ocr_image(image):
+    """Run Tesseract on a PIL image. Returns (text, mean word confidence 0-100)."""
+    data = pytesseract.image_to_data(image.convert("L"), output_type=pytesseract.Output.DICT)
+    lines, confidences = {}, []
+    for i, word in enumerate(data["text"]):
+        confidence = float(data["conf"][i])
+        if not word.strip() or confidence < 0:
+            continue
+        confidences.append(confidence)
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+    text = "\n".join(" ".join(words) for _, words in sorted(lines.items()))
+    return text, (sum(confidences) / len(confidences) if confidences else 0.0)
+
+def field_coverage(text):
+    """Names of the ticket fields found in text."""
+    return [field for field, pattern in FIELD_PATTERNS.items() if pattern.search(text)]
+
+
+class TierStats:
+    """Thread-safe counters for which tier answered each image and how long each tier took."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {"local": 0, "gemini": 0}
+        self.ocr_seconds = 0.0
+        self.gemini_seconds = 0.0
+
+    def record(self, tier, ocr_seconds=0.0, gemini_seconds=0.0):
+        with self.lock:
+            self.calls[tier] += 1
+            self.ocr_seconds += ocr_seconds
+            self.gemini_seconds += gemini_seconds
+
+    def report(self, gemini_estimate_s):
+        with self.lock:
+            calls, ocr_seconds, gemini_seconds = dict(self.calls), self.ocr_seconds, self.gemini_seconds
+        # Gemini latency is measured once it has been called, otherwise estimated.
+        gemini_avg = gemini_seconds / calls["gemini"] if calls["gemini"] else gemini_estimate_s
+        # OCR time spent on images that were escalated anyway counts against the savings.
+        saved = calls["local"] * gemini_avg - ocr_seconds
+        return {
+            "local_ocr": calls["local"],
+            "gemini_vision": calls["gemini"],
+            "ocr_seconds": round(ocr_seconds, 3),
+            "gemini_seconds": round(gemini_seconds, 3),
+            "latency_saved_seconds": round(saved, 3),
+        }
@@ -1,31 +1,119 @@
+import hashlib
+import json
 import os
+import shutil
+import threading
 from langchain.docstore.document import Document
 from langchain_community.vectorstores import FAISS
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain.text_splitter import CharacterTextSplitter
 from PyPDF2 import PdfReader
 
-def load_docs_from_folder(folder_path="./data"):
-    all_text = ""
-    for filename in os.listdir(folder_path):
+EMBEDDING_MODEL = "models/embedding-001"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+# Chunks sent to the embedding API per call while building an index.
+EMBED_BATCH_SIZE = 100
+# Session indexes are saved here, one directory per fingerprint of the data folder.
+INDEX_DIR = os.getenv("SESSION_INDEX_DIR", "./vectorstore/sessions")
+
+_index_lock = threading.Lock()
+_loaded = {}  # folder -> (fingerprint, vectorstore)
+_file_hashes = {}  # path -> (size, mtime_ns, sha256)
+
+def list_source_files(folder_path="./data"):
+    return [filename for filename in sorted(os.listdir(folder_path))
+            if filename.endswith((".pdf", ".txt")) and os.path.isfile(os.path.join(folder_path, filename))]
+
+def iter_docs_from_folder(folder_path="./data"):
+    # One Document per PDF page or TXT file, so chunks keep their source and nothing holds the whole corpus.
+    for filename in list_source_files(folder_path):
         path = os.path.join(folder_path, filename)
         if filename.endswith(".pdf"):
             pdf = PdfReader(path)
-            for page in pdf.pages:
-                all_text += page.extract_text() or ""
-        elif filename.endswith(".txt"):
+            for page_number, page in enumerate(pdf.pages, start=1):
+                text = page.extract_text() or ""
+                if text.strip():
+                    yield Document(page_content=text, metadata={"source": filename, "page": page_number})
+        else:
             with open(path, "r", encoding="utf-8") as f:
-                all_text += f.read() + "\n"
-    return all_text
+                yield Document(page_content=f.read(), metadata={"source": filename})
 
-def split_text_to_documents(text, chunk_size=1000, chunk_overlap=100):
+def iter_split_documents(docs, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
     splitter = CharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    chunks = splitter.split_text(text)
-    return [Document(page_content=chunk) for chunk in chunks]
+    for doc in docs:
+        yield from splitter.split_documents([doc])
+
+def iter_batches(items, batch_size=EMBED_BATCH_SIZE):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 def create_vectorstore_from_pdf(folder_path="./data"):
-    raw_text = load_docs_from_folder(folder_path)
-    docs = split_text_to_documents(raw_text)
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    vectorstore = FAISS.from_documents(docs, embeddings)
+    embeddings = GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+    vectorstore = None
+    for batch in iter_batches(iter_split_documents(iter_docs_from_folder(folder_path))):
+        if vectorstore is None:
+            vectorstore = FAISS.from_documents(batch, embeddings)
+        else:
+            vectorstore.add_documents(batch)
+    if vectorstore is None:
+        raise ValueError(f"No text found in the PDF/TXT files of {folder_path}")
     return vectorstore
+
+def _file_hash(path):
+    # Re-hash a file only when its size or mtime changes.
+    stat = os.stat(path)
+    cached = _file_hashes.get(path)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    _file_hashes[path] = (stat.st_size, stat.st_mtime_ns, h.hexdigest())
+    return h.hexdigest()
+
+def folder_fingerprint(folder_path="./data"):
+    # Covers exactly the files iter_docs_from_folder reads, plus the settings that shape the index.
+    entries = []
+    for filename in list_source_files(folder_path):
+        path = os.path.join(folder_path, filename)
+        entries.append([filename, os.path.getsize(path), _file_hash(path)])
+    payload = {"files": entries, "model": EMBEDDING_MODEL, "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP, "loader": "per-page"}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def get_session_vectorstore(folder_path="./data", index_dir=INDEX_DIR):
+    """Return the session index for folder_path, building and saving it only when the folder's fingerprint changes."""
+    with _index_lock:
+        fingerprint = folder_fingerprint(folder_path)
+        key = os.path.abspath(folder_path)
+        cached = _loaded.get(key)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+
+        path = os.path.join(index_dir, fingerprint)
+        embeddings = GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+        if os.path.exists(os.path.join(path, "index.faiss")):
+            vectorstore = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+        else:
+            vectorstore = create_vectorstore_from_pdf(folder_path)
+            # Save beside the final location and rename, so other processes never load a half-written index.
+            tmp_path = f"{path}.tmp-{os.getpid()}"
+            vectorstore.save_local(tmp_path)
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                # Another process published the same fingerprint first.
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            # Drop indexes for older versions of the folder (loaded indexes live in memory).
+            for name in os.listdir(index_dir):
+                if name != fingerprint and ".tmp-" not in name:
+                    shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+        _loaded[key] = (fingerprint, vectorstore)
+        return vectorstore
@@ -0,0 +1,65 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class Stage:
+    """One pipeline step: fn is called with the results of `inputs` (stage names or initial values).
+
+    If `when` is given it receives those same results and the stage is skipped when it
+    returns False; anything depending on a skipped or failed stage is skipped too.
+    """
+
+    def __init__(self, name, fn, inputs=(), when=None):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.when = when
+
+
+def run_stages(stages, initial=None, max_workers=4):
+    """Run stages as soon as their inputs are ready, independent ones concurrently.
+
+    Yields (name, status, value) in completion order, with status "done" (value is the
+    result), "failed" (value is the exception) or "skipped" (value is None). Stage
+    functions run on worker threads; the caller consumes results on its own thread.
+    """
+    results = dict(initial or {})
+    stages = {stage.name: stage for stage in stages}
+    for stage in stages.values():
+        for name in stage.inputs:
+            if name not in stages and name not in results:
+                raise ValueError(f"Stage {stage.name!r} depends on unknown input {name!r}")
+
+    pending, running, blocked = dict(stages), {}, set()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            progressed = False
+            for name, stage in list(pending.items()):
+                if any(dep in blocked for dep in stage.inputs):
+                    progressed = True
+                    del pending[name]
+                    blocked.add(name)
+                    yield name, "skipped", None
+                elif all(dep in results for dep in stage.inputs):
+                    progressed = True
+                    del pending[name]
+                    args = [results[dep] for dep in stage.inputs]
+                    if stage.when is not None and not stage.when(*args):
+                        blocked.add(name)
+                        yield name, "skipped", None
+                    else:
+                        running[pool.submit(stage.fn, *args)] = name
+            if not running:
+                if not progressed:
+                    raise ValueError(f"Stages {sorted(pending)} depend on each other")
+                # Stages skipped in this pass may have unblocked others; check again.
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    blocked.add(name)
+                    yield name, "failed", e
+                else:
+                    yield name, "done", results[name]
@@ -0,0 +1,28 @@
+from langchain.chains import LLMChain
+from langchain.output_parsers import PydanticOutputParser
+from langchain.prompts import PromptTemplate
+from pydantic import BaseModel, Field
+from utils.gemini_chain import get_gemini_model
+
+class FusedResult(BaseModel):
+    evidence: str = Field(description="Valid evidence of event participation found in the content")
+    participated: bool = Field(description="Whether the evidence confirms the student actually participated in the event")
+    verdict_reason: str = Field(description="One or two sentences explaining the participation verdict")
+    learnings: str = Field(description="Technical terms, key learnings, and insights from the student's notes")
+
+parser = PydanticOutputParser(pydantic_object=FusedResult)
+
+def fused_chain():
+    # Evidence, verdict and learnings from one call, so the student input is only sent once.
+    prompt = PromptTemplate(
+        template=(
+            "Review the following student content about an industry event.\n"
+            "1. Identify valid evidence of event participation.\n"
+            "2. Based on that evidence, decide if the student actually participated in the event.\n"
+            "3. Extract technical terms, key learnings, and insights from the notes.\n\n"
+            "{format_instructions}\n\n{input_text}"
+        ),
+        input_variables=["input_text"],
+        partial_variables={"format_instructions": parser.get_format_instructions()},
+    )
+    return LLMChain(llm=get_gemini_model(), prompt=prompt)
@@ -1,9 +1,23 @@
 from langchain.chains import LLMChain
+from langchain.output_parsers import PydanticOutputParser
 from langchain.prompts import PromptTemplate
+from pydantic import BaseModel, Field
 from utils.gemini_chain import get_gemini_model
 
+class Verdict(BaseModel):
+    participated: bool = Field(description="Whether the evidence confirms the student actually participated in the event")
+    verdict_reason: str = Field(description="One or two sentences explaining the participation verdict")
+
+parser = PydanticOutputParser(pydantic_object=Verdict)
+
 def verifier_chain():
-    prompt = PromptTemplate.from_template(
-        "Based on this evidence, confirm if the student actually participated in the event:\n\n{input_text}"
+    # An explicit verdict field, so results can be filtered on it; prose answers rarely lead with yes/no.
+    prompt = PromptTemplate(
+        template=(
+            "Based on this evidence, confirm if the student actually participated in the event.\n\n"
+            "{format_instructions}\n\n{input_text}"
+        ),
+        input_variables=["input_text"],
+        partial_variables={"format_instructions": parser.get_format_instructions()},
     )
     return LLMChain(llm=get_gemini_model(), prompt=prompt)
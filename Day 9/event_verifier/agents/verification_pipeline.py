@@ -0,0 +1,96 @@
+import time
+from langchain_core.exceptions import OutputParserException
+from agents.evidence_extractor import evidence_chain
+from agents.participation_verifier import parser as verdict_parser, verifier_chain
+from agents.learning_outcome_extractor import learning_outcome_chain
+from agents.session_alignment_agent import get_session_alignment_chain
+from agents.fused_extractor import fused_chain, parser as fused_parser
+
+STEPS = ("evidence", "verified", "learnings", "alignment")
+
+def parse_verdict(reply):
+    """(participated, verified text) from the staged verifier's structured reply.
+
+    A reply that doesn't match the schema keeps its raw text with participated None,
+    rather than failing the whole verification.
+    """
+    try:
+        verdict = verdict_parser.parse(reply)
+    except OutputParserException:
+        return None, reply
+    return verdict.participated, f"{'Yes' if verdict.participated else 'No'}. {verdict.verdict_reason}"
+
+def prompt_chars(chain, input_text):
+    """Length of the prompt `chain` sends for `input_text`, including its fixed instructions."""
+    return len(chain.prompt.format(input_text=input_text))
+
+def run_verification(input_text, session_path, mode="staged", on_step=None, before_call=None):
+    """Run evidence extraction, participation verification, learning extraction and session alignment.
+
+    on_step(name, value) is called as each step in STEPS finishes (and with "fallback" if
+    fused mode fails validation); before_call() runs before every LLM round trip, e.g. to
+    rate-limit. Returns the step results, the participation verdict as a bool (None when
+    the staged verifier's reply doesn't match its schema) and run metrics.
+    """
+    notify = on_step or (lambda name, value: None)
+    call = before_call or (lambda: None)
+    started = time.perf_counter()
+    llm_calls, sent_chars = 0, 0
+    fused = None
+    if mode == "fused":
+        try:
+            call()
+            chain = fused_chain()
+            llm_calls, sent_chars = 1, prompt_chars(chain, input_text)
+            fused = fused_parser.parse(chain.run(input_text))
+        except Exception as e:
+            notify("fallback", str(e))
+
+    if fused:
+        evidence = fused.evidence
+    else:
+        call()
+        chain = evidence_chain()
+        evidence = chain.run(input_text)
+        llm_calls, sent_chars = llm_calls + 1, sent_chars + prompt_chars(chain, input_text)
+    notify("evidence", evidence)
+
+    if fused:
+        participated = fused.participated
+        verified = f"{'Yes' if participated else 'No'}. {fused.verdict_reason}"
+    else:
+        call()
+        chain = verifier_chain()
+        reply = chain.run(evidence)
+        llm_calls, sent_chars = llm_calls + 1, sent_chars + prompt_chars(chain, evidence)
+        participated, verified = parse_verdict(reply)
+    notify("verified", verified)
+
+    if fused:
+        learnings = fused.learnings
+    else:
+        call()
+        chain = learning_outcome_chain()
+        learnings = chain.run(input_text)
+        llm_calls, sent_chars = llm_calls + 1, sent_chars + prompt_chars(chain, input_text)
+    notify("learnings", learnings)
+    extraction_s = time.perf_counter() - started
+
+    call()
+    alignment = get_session_alignment_chain(session_path).run(learnings)
+    notify("alignment", alignment)
+
+    return {
+        "evidence": evidence,
+        "verified": verified,
+        "participated": participated,
+        "learnings": learnings,
+        "alignment": alignment,
+        "metrics": {
+            "mode": "fused" if fused else "staged",
+            "extraction_llm_calls": llm_calls,
+            "extraction_input_chars": sent_chars,
+            "extraction_seconds": round(extraction_s, 3),
+            "total_seconds": round(time.perf_counter() - started, 3),
+        },
+    }
@@ -0,0 +1,129 @@
+"""Verify a whole cohort without the Streamlit UI.
+
+The cohort directory has one subfolder per student holding that student's evidence files:
+
+    cohort/
+        alice/  ticket.pdf  linkedin.png  notes.txt
+        bob/    ...
+
+Results are appended to a JSONL checkpoint as each student finishes. Re-running with the
+same checkpoint skips students already verified and retries the ones that failed.
+
+    python batch_verify.py cohort/ --event "DevFest 2025" --workers 8 --rpm 60 --checkpoint results/cohort.jsonl
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from tools.file_tools import combine_inputs, evidence_hash, read_student_files
+from tools.rag_tools import build_session_index
+from tools import result_store
+from agents.verification_pipeline import run_verification
+from utils.rate_limiter import RateLimiter
+
+def completed_students(checkpoint_path):
+    done = set()
+    if not os.path.exists(checkpoint_path):
+        return done
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # last line of an interrupted run
+            if record.get("status") == "ok":
+                done.add(record["student"])
+    return done
+
+class Checkpoint:
+    """Append-only JSONL log; each record is flushed and fsynced before the next is written."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        # Terminate a half-written last line from an interrupted run so new records parse.
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                partial = f.read(1) != b"\n"
+        else:
+            partial = False
+        self.file = open(path, "a", encoding="utf-8")
+        if partial:
+            self.file.write("\n")
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+def verify_student(student, folder, event, session_path, mode, limiter):
+    started = time.time()
+    try:
+        files = read_student_files(folder)
+        files_hash = evidence_hash(files)
+        stored = result_store.get_result(student, event, files_hash)
+        if stored:
+            result = {key: stored[key] for key in ("evidence", "verified", "participated", "learnings", "alignment", "metrics")}
+            return {"student": student, "status": "ok", "from_store": True, **result, "finished_at": time.time(), "seconds": round(time.time() - started, 3)}
+        input_text = combine_inputs(files)
+        if not input_text.strip():
+            raise ValueError("no supported evidence files (.pdf, .png, .jpg, .jpeg, .txt)")
+        result = run_verification(input_text, session_path, mode=mode, before_call=limiter.acquire)
+        result_store.save_result(student, event, files_hash, result)
+        return {"student": student, "status": "ok", "from_store": False, **result, "finished_at": time.time(), "seconds": round(time.time() - started, 3)}
+    except Exception as e:
+        return {"student": student, "status": "error", "error": f"{type(e).__name__}: {e}",
+                "traceback": traceback.format_exc(), "finished_at": time.time(), "seconds": round(time.time() - started, 3)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify every student in a cohort directory")
+    parser.add_argument("cohort_dir", help="directory with one subfolder of evidence files per student")
+    parser.add_argument("--event", required=True, help="event name results are stored under")
+    parser.add_argument("--session", default=os.path.join("data", "session.txt"), help="official session document")
+    parser.add_argument("--checkpoint", default=os.path.join("results", "batch_results.jsonl"))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rpm", type=float, default=float(os.getenv("GEMINI_RPM", "60")), help="max LLM requests per minute")
+    parser.add_argument("--mode", choices=["staged", "fused"], default=os.getenv("VERIFIER_MODE", "staged"))
+    args = parser.parse_args()
+
+    if not os.path.exists(args.session):
+        parser.error(f"session document not found: {args.session}")
+    students = sorted(name for name in os.listdir(args.cohort_dir) if os.path.isdir(os.path.join(args.cohort_dir, name)))
+    done = completed_students(args.checkpoint)
+    pending = [name for name in students if name not in done]
+    print(f"[INFO] {len(students)} students, {len(done & set(students))} already verified, {len(pending)} to run")
+    if not pending:
+        return
+
+    # Built (or loaded) once up front so workers don't all wait on it.
+    build_session_index(args.session)
+    limiter = RateLimiter(args.rpm)
+    checkpoint = Checkpoint(args.checkpoint)
+    pool = ThreadPoolExecutor(max_workers=args.workers)
+    failed = 0
+    try:
+        futures = [pool.submit(verify_student, name, os.path.join(args.cohort_dir, name), args.event, args.session, args.mode, limiter) for name in pending]
+        for i, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            checkpoint.append(record)
+            failed += record["status"] != "ok"
+            print(f"[{i}/{len(pending)}] {record['student']}: {record['status']} ({record['seconds']}s)")
+    finally:
+        # On Ctrl+C, drop queued students; anything unfinished is picked up by the next run.
+        pool.shutdown(wait=False, cancel_futures=True)
+        checkpoint.close()
+    print(f"[INFO] Done: {len(pending) - failed} verified, {failed} failed. Results in {args.checkpoint}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,15 @@
 import streamlit as st
 import os
-from tools.file_tools import load_student_inputs
-from agents.evidence_extractor import evidence_chain
-from agents.participation_verifier import verifier_chain
-from agents.learning_outcome_extractor import learning_outcome_chain
-from agents.session_alignment_agent import get_session_alignment_chain
+import time
+from tools.file_tools import combine_inputs, evidence_hash
+from agents.verification_pipeline import STEPS, run_verification
+from tools.rag_tools import start_session_index_build
+from tools import result_store
 
 st.set_page_config(page_title="🎓 Industry Event Participation Verifier", layout="wide")
 st.title("🎓 Industry Event Participation Verifier (LangChain + Gemini)")
 
 # Create folders
-os.makedirs("uploads/inputs", exist_ok=True)
 os.makedirs("data", exist_ok=True)
 
 # -------------------- Admin: Upload Official Session Document --------------------
@@ -18,20 +17,34 @@ with st.expander("🛠️ Admin Only: Upload Official Session Document"):
     uploaded_session_doc = st.file_uploader("📘 Upload Official Event Session Document (TXT)", type=["txt"], key="session_doc")
     if uploaded_session_doc:
         session_path = os.path.join("data", "session.txt")
-        with open(session_path, "wb") as f:
-            f.write(uploaded_session_doc.read())
+        content = uploaded_session_doc.getvalue()
+        previous = None
+        if os.path.exists(session_path):
+            with open(session_path, "rb") as f:
+                previous = f.read()
+        # Streamlit reruns this on every interaction; only a new document triggers a build.
+        if content != previous:
+            with open(session_path, "wb") as f:
+                f.write(content)
+            start_session_index_build(session_path)
+            st.info("⏳ Building the session index in the background.")
         st.success("✅ Official session document saved to `data/session.txt`.")
 
 # -------------------- Student Evidence Upload --------------------
 with st.sidebar:
     st.header("📤 Upload Files")
+    student_id = st.text_input("🧑‍🎓 Student ID")
+    event_name = st.text_input("📌 Event Name")
     input_files = st.file_uploader("📝 Upload Student Evidence (ticket, LinkedIn post, notes)", accept_multiple_files=True)
+    # "fused" gets evidence, verdict and learnings from one Gemini call; "staged" makes one call per step.
+    modes = ["staged", "fused"]
+    mode = st.radio("⚙️ Extraction mode", modes, index=modes.index(os.getenv("VERIFIER_MODE", "staged")))
 
 # -------------------- Verify Button --------------------
 if st.button("🧠 Run Verification"):
 
-    if not input_files:
-        st.error("Please upload student evidence files.")
+    if not input_files or not student_id or not event_name:
+        st.error("Please enter the student ID and event name, and upload student evidence files.")
         st.stop()
 
     session_path = os.path.join("data", "session.txt")
@@ -39,36 +52,57 @@ if st.button("🧠 Run Verification"):
         st.error("❌ Session document not found in `data/session.txt`. Please upload it using the Admin section.")
         st.stop()
 
-    # Save student evidence
-    for f in input_files:
-        input_path = os.path.join("uploads/inputs", f.name)
-        with open(input_path, "wb") as out_file:
-            out_file.write(f.read())
+    # Each run reads only this submission's files, straight from memory
+    files = [(f.name, f.getvalue()) for f in input_files]
+    files_hash = evidence_hash(files)
+    stored = result_store.get_result(student_id, event_name, files_hash)
 
-    st.info("⏳ Processing student evidence...")
+    step_titles = {
+        "evidence": "🔍 Step 1: Evidence Extraction",
+        "verified": "✅ Step 2: Participation Verification",
+        "learnings": "🧠 Step 3: Learning Outcome Extraction",
+        "alignment": "📚 Step 4: Session Alignment (RAG)",
+    }
 
-    # Load and preview student notes
-    input_text = load_student_inputs("uploads/inputs")
-    with st.expander("📎 Preview: Combined Student Inputs"):
-        st.text(input_text[:2000])
+    def show_step(name, value):
+        if name == "fallback":
+            st.warning(f"⚠️ Fused extraction failed ({value}); falling back to staged mode.")
+            return
+        st.subheader(step_titles[name])
+        st.success(value)
 
-    # -------------------- Step 1: Evidence Extraction --------------------
-    st.subheader("🔍 Step 1: Evidence Extraction")
-    evidence = evidence_chain().run(input_text)
-    st.success(evidence)
+    if stored:
+        # Identical evidence was already verified for this student and event.
+        st.info(f"♻️ Same evidence already verified on {time.strftime('%Y-%m-%d %H:%M', time.localtime(stored['created_at']))}; showing the stored result.")
+        for name in STEPS:
+            show_step(name, stored[name])
+        result = stored
+    else:
+        st.info("⏳ Processing student evidence...")
+        input_text = combine_inputs(files)
+        with st.expander("📎 Preview: Combined Student Inputs"):
+            st.text(input_text[:2000])
+        result = run_verification(input_text, session_path, mode=mode, on_step=show_step)
+        result_store.save_result(student_id, event_name, files_hash, result)
 
-    # -------------------- Step 2: Participation Verification --------------------
-    st.subheader("✅ Step 2: Participation Verification")
-    verified = verifier_chain().run(evidence)
-    st.success(verified)
+    with st.expander("⏱️ Run metrics"):
+        st.json(result["metrics"])
 
-    # -------------------- Step 3: Learning Outcome Extraction --------------------
-    st.subheader("🧠 Step 3: Learning Outcome Extraction")
-    learnings = learning_outcome_chain().run(input_text)
-    st.success(learnings)
-
-    # -------------------- Step 4: Session Alignment (RAG) --------------------
-    st.subheader("📚 Step 4: Session Alignment (RAG)")
-    rag_chain = get_session_alignment_chain(session_path)
-    alignment = rag_chain.run(learnings)
-    st.success(alignment)
+# -------------------- Admin: Stored Results --------------------
+with st.expander("🛠️ Admin Only: Verification Results"):
+    col1, col2, col3 = st.columns(3)
+    student_filter = col1.text_input("Student ID starts with", key="filter_student")
+    event_filter = col2.selectbox("Event", [""] + result_store.list_events(), key="filter_event")
+    verdict_filter = col3.selectbox("Participation", ["Any", "Verified", "Not verified"], key="filter_verdict")
+    page_size = 100
+    page = st.number_input("Page", min_value=1, value=1, step=1, key="filter_page")
+    rows = result_store.list_results(
+        student=student_filter or None,
+        event=event_filter or None,
+        participated={"Any": None, "Verified": True, "Not verified": False}[verdict_filter],
+        limit=page_size,
+        offset=(page - 1) * page_size,
+    )
+    for row in rows:
+        row["created_at"] = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["created_at"]))
+    st.dataframe(rows, use_container_width=True)
@@ -1,42 +1,169 @@
 import pytesseract
 import fitz  # PyMuPDF
-from PIL import Image
+from PIL import Image, ImageOps
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import io
 import os
+import threading
 
-def extract_text_from_pdf(path):
+# Extracted text is cached on disk by content hash, so duplicate or re-submitted files are never OCR'd twice.
+CACHE_DIR = os.getenv("OCR_CACHE_DIR", os.path.join("cache", "ocr"))
+# Bump when extraction or preprocessing changes so old cache entries are ignored.
+CACHE_VERSION = "1"
+# Images OCR'd in parallel; each Tesseract run is single-threaded and CPU bound.
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+# Images are downscaled to this DPI (or, without DPI info, to this many pixels on the long side).
+TARGET_DPI = 300
+MAX_SIDE = 2000
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _cache_path(kind, data):
+    digest = hashlib.sha256(data).hexdigest()
+    return os.path.join(CACHE_DIR, f"{kind}-v{CACHE_VERSION}-{digest}.txt")
+
+def _cache_get(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def _cache_put(path, text):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def preprocess_image(image):
+    """Grayscale, downscale to TARGET_DPI and binarize (Otsu) an image for Tesseract."""
+    dpi = image.info.get("dpi", (0, 0))[0]
+    image = ImageOps.exif_transpose(image).convert("L")
+    scale = TARGET_DPI / dpi if dpi and dpi > TARGET_DPI else min(1.0, MAX_SIDE / max(image.size))
+    if scale < 1.0:
+        image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))), Image.LANCZOS)
+
+    histogram = image.histogram()
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_below, weight_below, best, threshold = 0, 0, -1.0, 127
+    for i, count in enumerate(histogram):
+        weight_below += count
+        if weight_below == 0 or weight_below == total:
+            continue
+        sum_below += i * count
+        mean_below = sum_below / weight_below
+        mean_above = (sum_all - sum_below) / (total - weight_below)
+        variance = weight_below * (total - weight_below) * (mean_below - mean_above) ** 2
+        if variance > best:
+            best, threshold = variance, i
+    return image.point(lambda p: 255 if p > threshold else 0)
+
+def _ocr(data):
+    # Runs in a worker process; errors are returned rather than raised so they aren't cached.
     try:
-        doc = fitz.open(path)
-        return "\n".join(page.get_text() for page in doc)
+        image = Image.open(io.BytesIO(data))
+        return True, pytesseract.image_to_string(preprocess_image(image))
     except Exception as e:
-        return f"[ERROR extracting PDF: {path}] {e}"
+        return False, str(e)
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS)
+        return _pool
 
-def extract_text_from_image(path):
+def extract_text_from_pdf(data, name="upload.pdf"):
+    cache_path = _cache_path("pdf", data)
+    cached = _cache_get(cache_path)
+    if cached is not None:
+        return cached
     try:
-        image = Image.open(path)
-        return pytesseract.image_to_string(image)
+        doc = fitz.open(stream=data, filetype="pdf")
+        text = "\n".join(page.get_text() for page in doc)
     except Exception as e:
-        return f"[ERROR extracting image text: {path}] {e}"
+        return f"[ERROR extracting PDF: {name}] {e}"
+    _cache_put(cache_path, text)
+    return text
+
+def extract_text_from_image(data, name="upload.png"):
+    return extract_texts_from_images([(name, data)])[0]
+
+def extract_texts_from_images(images):
+    """OCR (name, bytes) pairs, cached ones from disk and the rest across the process pool."""
+    keys = [_cache_path("image", data) for _, data in images]
+    texts, misses = {}, {}
+    for cache_path, (name, data) in zip(keys, images):
+        cached = _cache_get(cache_path)
+        if cached is not None:
+            texts[cache_path] = cached
+        else:
+            # Identical screenshots in one submission are OCR'd once.
+            misses.setdefault(cache_path, (name, data))
+
+    if len(misses) > 1 and OCR_WORKERS > 1:
+        outputs = list(_get_pool().map(_ocr, [data for _, data in misses.values()]))
+    else:
+        outputs = [_ocr(data) for _, data in misses.values()]
+
+    for (cache_path, (name, _)), (ok, text) in zip(misses.items(), outputs):
+        if ok:
+            _cache_put(cache_path, text)
+            texts[cache_path] = text
+        else:
+            texts[cache_path] = f"[ERROR extracting image text: {name}] {text}"
+    return [texts[cache_path] for cache_path in keys]
+
+def extract_text(name, data):
+    """Return (tag, text) for one file's bytes, or None if the file type is unsupported."""
+    lower = name.lower()
+    if lower.endswith(".pdf"):
+        return "[PDF]", extract_text_from_pdf(data, name)
+    elif lower.endswith((".png", ".jpg", ".jpeg")):
+        return "[IMAGE]", extract_text_from_image(data, name)
+    elif lower.endswith(".txt"):
+        return "[TEXT]", data.decode("utf-8", errors="replace")
+    return None
+
+def combine_inputs(files):
+    """Combine (name, bytes) pairs into one labelled text, in the order given."""
+    files = list(files)
+    # OCR all images up front so they run in parallel instead of one by one.
+    images = [(name, data) for name, data in files if name.lower().endswith((".png", ".jpg", ".jpeg"))]
+    image_texts = iter(extract_texts_from_images(images))
 
-def load_student_inputs(folder_path):
     texts = []
-    for file in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, file)
-        content = ""
-
-        if file.lower().endswith(".pdf"):
-            content = extract_text_from_pdf(file_path)
-            tag = "[PDF]"
-        elif file.lower().endswith((".png", ".jpg", ".jpeg")):
-            content = extract_text_from_image(file_path)
-            tag = "[IMAGE]"
-        elif file.lower().endswith(".txt"):
-            with open(file_path, 'r', encoding="utf-8") as f:
-                content = f.read()
-            tag = "[TEXT]"
+    for name, data in files:
+        if name.lower().endswith((".png", ".jpg", ".jpeg")):
+            extracted = "[IMAGE]", next(image_texts)
         else:
+            extracted = extract_text(name, data)
+        if extracted is None:
             continue  # unsupported file type
+        tag, content = extracted
 
         # Add file label and content
-        texts.append(f"{tag} {file}:\n{content.strip()}\n")
+        texts.append(f"{tag} {name}:\n{content.strip()}\n")
 
     return "\n\n".join(texts)
+
+def evidence_hash(files):
+    """Content hash of a set of (name, bytes) files, independent of file names and upload order."""
+    digests = sorted(hashlib.sha256(data).hexdigest() for _, data in files)
+    return hashlib.sha256("\n".join(digests).encode("utf-8")).hexdigest()
+
+def read_student_files(folder_path):
+    files = []
+    for file in sorted(os.listdir(folder_path)):
+        file_path = os.path.join(folder_path, file)
+        if os.path.isfile(file_path):
+            with open(file_path, "rb") as f:
+                files.append((file, f.read()))
+    return files
+
+def load_student_inputs(folder_path):
+    return combine_inputs(read_student_files(folder_path))
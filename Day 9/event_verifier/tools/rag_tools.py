@@ -3,15 +3,111 @@ from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain.text_splitter import CharacterTextSplitter
 from langchain.document_loaders import TextLoader
 
+import hashlib
+import json
 import os
+import shutil
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are only serialised within this process
+    fcntl = None
+
+EMBEDDING_MODEL = "models/embedding-001"
+# Built indexes live next to the session document: <dir>/session_index/<version>/ plus a
+# CURRENT file naming the live version, which is replaced atomically after each build.
+INDEX_DIR_NAME = "session_index"
+
+_build_lock = threading.Lock()
+_loaded = {}  # index dir -> (version, vectorstore)
+
+def _index_dir(event_doc_path):
+    return os.path.join(os.path.dirname(os.path.abspath(event_doc_path)), INDEX_DIR_NAME)
+
+def _doc_stat(event_doc_path):
+    stat = os.stat(event_doc_path)
+    return stat.st_size, stat.st_mtime_ns
+
+def _doc_hash(event_doc_path):
+    with open(event_doc_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def current_index(event_doc_path):
+    """Return the stamp of the live index ({"version", "sha256", "size", "mtime_ns"}) or None."""
+    try:
+        with open(os.path.join(_index_dir(event_doc_path), "CURRENT"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _write_current(index_dir, stamp):
+    tmp_path = os.path.join(index_dir, "CURRENT.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stamp, f)
+    os.replace(tmp_path, os.path.join(index_dir, "CURRENT"))
+
+def build_session_index(event_doc_path):
+    """Embed the session document into a new index version unless the current one already matches it.
+
+    Builds are serialised across threads and (where fcntl exists) processes.
+    """
+    index_dir = _index_dir(event_doc_path)
+    os.makedirs(index_dir, exist_ok=True)
+    with _build_lock, open(os.path.join(index_dir, "build.lock"), "w") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        size, mtime_ns = _doc_stat(event_doc_path)
+        digest = _doc_hash(event_doc_path)
+        stamp = current_index(event_doc_path)
+        if stamp is not None and stamp["sha256"] == digest:
+            if (stamp["size"], stamp["mtime_ns"]) != (size, mtime_ns):
+                # Same content re-saved: refresh the stamp without re-embedding.
+                _write_current(index_dir, dict(stamp, size=size, mtime_ns=mtime_ns))
+            return stamp["version"]
+
+        loader = TextLoader(event_doc_path)
+        documents = loader.load()
+        splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+        docs = splitter.split_documents(documents)
+
+        embeddings = GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+        vectorstore = FAISS.from_documents(docs, embeddings)
+
+        number = int(stamp["version"].split("-")[0][1:]) + 1 if stamp else 1
+        version = f"v{number:06d}-{digest[:12]}"
+        tmp_path = os.path.join(index_dir, f"{version}.tmp")
+        vectorstore.save_local(tmp_path)
+        # Leftover from a build interrupted before CURRENT was written.
+        shutil.rmtree(os.path.join(index_dir, version), ignore_errors=True)
+        os.replace(tmp_path, os.path.join(index_dir, version))
+        _write_current(index_dir, {"version": version, "sha256": digest, "size": size, "mtime_ns": mtime_ns})
+
+        # Keep the previous version for readers that picked it up just before the swap.
+        versions = sorted(name for name in os.listdir(index_dir) if name.startswith("v") and not name.endswith(".tmp"))
+        for name in versions[:-2]:
+            shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+        return version
+
+def start_session_index_build(event_doc_path):
+    """Build the session index on a background thread; concurrent requests queue on the build lock."""
+    thread = threading.Thread(target=build_session_index, args=(event_doc_path,), name="session-index-build", daemon=True)
+    thread.start()
+    return thread
 
 def get_rag_retriever(event_doc_path):
-    loader = TextLoader(event_doc_path)
-    documents = loader.load()
-    splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    docs = splitter.split_documents(documents)
+    stamp = current_index(event_doc_path)
+    if stamp is None or (stamp["size"], stamp["mtime_ns"]) != _doc_stat(event_doc_path):
+        # No index yet, or the document changed without an admin upload: build (or wait for
+        # the build already running) before answering.
+        build_session_index(event_doc_path)
+        stamp = current_index(event_doc_path)
 
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    vectorstore = FAISS.from_documents(docs, embeddings)
+    index_dir = _index_dir(event_doc_path)
+    loaded = _loaded.get(index_dir)
+    if loaded is None or loaded[0] != stamp["version"]:
+        embeddings = GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+        vectorstore = FAISS.load_local(os.path.join(index_dir, stamp["version"]), embeddings, allow_dangerous_deserialization=True)
+        loaded = _loaded[index_dir] = (stamp["version"], vectorstore)
 
-    return vectorstore.as_retriever()
+    return loaded[1].as_retriever()
@@ -0,0 +1,101 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+
+# Verification results, one row per (student, event, evidence set).
+DB_PATH = os.getenv("RESULTS_DB", os.path.join("data", "results.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    student TEXT NOT NULL COLLATE NOCASE,
+    event TEXT NOT NULL COLLATE NOCASE,
+    evidence_hash TEXT NOT NULL,
+    mode TEXT,
+    participated INTEGER,
+    evidence TEXT,
+    verified TEXT,
+    learnings TEXT,
+    alignment TEXT,
+    metrics TEXT,
+    created_at REAL NOT NULL,
+    UNIQUE (student, event, evidence_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_results_event ON results (event, created_at);
+CREATE INDEX IF NOT EXISTS idx_results_hash ON results (evidence_hash);
+CREATE INDEX IF NOT EXISTS idx_results_created ON results (created_at);
+CREATE INDEX IF NOT EXISTS idx_results_participated ON results (participated, created_at);
+"""
+RESULT_FIELDS = ("evidence", "verified", "learnings", "alignment")
+
+_initialised = set()
+
+@contextmanager
+def _connect(db_path):
+    if db_path not in _initialised:
+        # sqlite3 can create the file but not its directory.
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    # A connection per call keeps the store safe to use from Streamlit reruns and batch worker threads.
+    with closing(sqlite3.connect(db_path, timeout=30)) as conn:
+        conn.row_factory = sqlite3.Row
+        if db_path not in _initialised:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            _initialised.add(db_path)
+        with conn:
+            yield conn
+
+def _row_to_result(row):
+    result = dict(row)
+    result["metrics"] = json.loads(result["metrics"]) if result["metrics"] else {}
+    result["participated"] = None if result["participated"] is None else bool(result["participated"])
+    return result
+
+def get_result(student, event, evidence_hash, db_path=DB_PATH):
+    """Stored result for this exact evidence set, or None."""
+    with _connect(db_path) as conn:
+        row = conn.execute(
+            "SELECT * FROM results WHERE student = ? AND event = ? AND evidence_hash = ?",
+            (student, event, evidence_hash),
+        ).fetchone()
+    return _row_to_result(row) if row else None
+
+def save_result(student, event, evidence_hash, result, db_path=DB_PATH):
+    """Store the dict returned by run_verification, replacing an earlier run on the same evidence."""
+    metrics = result.get("metrics", {})
+    participated = result.get("participated")
+    with _connect(db_path) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO results (student, event, evidence_hash, mode, participated, "
+            "evidence, verified, learnings, alignment, metrics, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (student, event, evidence_hash, metrics.get("mode"), None if participated is None else int(participated),
+             *(result.get(field) for field in RESULT_FIELDS), json.dumps(metrics), time.time()),
+        )
+
+def list_results(student=None, event=None, participated=None, limit=100, offset=0, db_path=DB_PATH):
+    """Newest results first. student matches by prefix, event exactly (both case-insensitive)."""
+    clauses, params = [], []
+    if student:
+        # Prefix LIKE on the NOCASE column can use the (student, event, evidence_hash) index.
+        clauses.append("student LIKE ? ESCAPE '\\'")
+        params.append(student.replace("%", r"\%").replace("_", r"\_") + "%")
+    if event:
+        clauses.append("event = ?")
+        params.append(event)
+    if participated is not None:
+        clauses.append("participated = ?")
+        params.append(int(participated))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with _connect(db_path) as conn:
+        rows = conn.execute(
+            f"SELECT id, student, event, evidence_hash, mode, participated, verified, created_at FROM results {where} "
+            "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+    return [dict(row, participated=None if row["participated"] is None else bool(row["participated"])) for row in rows]
+
+def list_events(db_path=DB_PATH):
+    with _connect(db_path) as conn:
+        return [row[0] for row in conn.execute("SELECT DISTINCT event FROM results ORDER BY event")]
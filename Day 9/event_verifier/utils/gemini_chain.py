@@ -1,9 +1,18 @@
 import os
+import threading
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 
 
 load_dotenv()
 
+_model = None
+_model_lock = threading.Lock()
+
 def get_gemini_model():
-    return ChatGoogleGenerativeAI(model="gemini-1.5-flash", google_api_key=os.getenv("GOOGLE_API_KEY"))
+    # One client per process: every chain shares its HTTP connection pool instead of opening its own.
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = ChatGoogleGenerativeAI(model="gemini-1.5-flash", google_api_key=os.getenv("GOOGLE_API_KEY"))
+        return _model
@@ -0,0 +1,28 @@
+import threading
+import time
+
+class RateLimiter:
+    """Token bucket shared by worker threads: at most `per_minute` acquisitions per rolling minute.
+
+    Tokens refill continuously, so a burst of up to `burst` calls can go out at once and
+    the rest are spaced evenly.
+    """
+
+    def __init__(self, per_minute, burst=1):
+        self.interval = 60.0 / per_minute
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * self.interval
+            time.sleep(wait)
@@ -6,6 +6,7 @@ from verifier.linkedin_parser import extract_linkedin_info
 from verifier.notes_rag import setup_rag, evaluate_alignment
 from verifier.pdf_verifier import verify_event_ticket
 from verifier.ocr_screenshot import extract_text_from_image
+from verifier.keyword_scanner import DEFAULT_EVENT, load_event_keywords
 
 # Load .env for Gemini API key
 load_dotenv()
@@ -15,10 +16,16 @@ st.title("Industry Event Participation Verifier")
 
 st.markdown("Upload evidence to verify your participation in a tech event like NASSCOM, Google DevFest, etc.")
 
+# --- Select Event (keyword sets live in data/event_keywords.json) ---
+events = load_event_keywords()
+event_ids = list(events)
+event = st.selectbox("Event", event_ids, index=event_ids.index(DEFAULT_EVENT) if DEFAULT_EVENT in events else 0,
+                     format_func=lambda event_id: events[event_id].get("name", event_id))
+
 # --- Upload Ticket PDF ---
-ticket = st.file_uploader("Upload DevFest Ticket PDF", type=["pdf"])
+ticket = st.file_uploader("Upload Event Ticket PDF", type=["pdf"])
 if ticket:
-    ticket_valid, ticket_keywords = verify_event_ticket(ticket)
+    ticket_valid, ticket_keywords = verify_event_ticket(ticket, event)
     if ticket_valid:
         st.success("✅ Ticket Verified with keywords: " + ", ".join(ticket_keywords))
     else:
@@ -29,7 +36,7 @@ screenshot = st.file_uploader("Upload LinkedIn Screenshot (optional)", type=["pn
 if screenshot:
     ocr_text = extract_text_from_image(screenshot)
     st.text_area("📝 OCR Extracted Text", ocr_text, height=200)
-    li_summary = extract_linkedin_info(ocr_text)
+    li_summary = extract_linkedin_info(ocr_text, event)
     st.info(f"🔍 Extracted Summary from LinkedIn: {li_summary}")
 
 # --- Upload Student Notes ---
@@ -0,0 +1,102 @@
+import json
+import os
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
+
+KEYWORDS_PATH = os.path.join("data", "event_keywords.json")
+DEFAULT_EVENT = os.getenv("EVENT_ID", "devfest")
+
+
+class KeywordScanner:
+    """Case-insensitive Aho-Corasick automaton: finds every keyword in one pass over the text.
+
+    Keywords match as substrings, like `kw.lower() in text.lower()`.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keywords))
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword.lower():
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append(index)
+
+        # Breadth-first, so each state's failure link is final before its children use it.
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def iter_matches(self, text):
+        """Yield (end_offset, keyword_index) for every keyword occurrence in text."""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for offset, original in enumerate(text):
+            # Lower per character so offsets stay aligned with text (some lower() results are longer).
+            for char in original.lower():
+                while state and char not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(char, 0)
+                for index in output[state]:
+                    yield offset, index
+
+    def find(self, text):
+        """Keywords present in text, in configured order."""
+        found = {index for _, index in self.iter_matches(text)}
+        return [keyword for index, keyword in enumerate(self.keywords) if index in found]
+
+    def scan_pages(self, pages, threshold):
+        """Scan an iterable of page texts, stopping once `threshold` distinct keywords are found.
+
+        Returns (found keywords in configured order, number of pages read). Pages are
+        pulled lazily, so pages after the threshold is met are never extracted.
+        """
+        found, pages_read = set(), 0
+        for text in pages:
+            pages_read += 1
+            for _, index in self.iter_matches(text or ""):
+                found.add(index)
+                if len(found) >= threshold:
+                    break
+            if len(found) >= threshold:
+                break
+        return [keyword for index, keyword in enumerate(self.keywords) if index in found], pages_read
+
+    def matching_lines(self, text):
+        """Lines of text that contain at least one keyword, in order."""
+        lines = text.split("\n")
+        starts, position = [], 0
+        for line in lines:
+            starts.append(position)
+            position += len(line) + 1
+        hits = sorted({bisect_right(starts, offset) - 1 for offset, _ in self.iter_matches(text)})
+        return [lines[i] for i in hits]
+
+
+def load_event_keywords(path=KEYWORDS_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+@lru_cache(maxsize=None)
+def get_scanner(event=DEFAULT_EVENT, source="ticket", path=KEYWORDS_PATH):
+    """(scanner, threshold) for one event's keyword set; built once per process."""
+    config = load_event_keywords(path)
+    if event not in config:
+        raise KeyError(f"No keywords configured for event {event!r} in {path}; known events: {sorted(config)}")
+    entry = config[event][source]
+    return KeywordScanner(entry["keywords"]), entry.get("threshold", 1)
@@ -1,5 +1,6 @@
-def extract_linkedin_info(text):
-    lines = text.split('\n')
-    keywords = ["DevFest", "speaker", "AI", "keynote", "event", "Google", "Firebase"]
-    extracted = [line for line in lines if any(kw.lower() in line.lower() for kw in keywords)]
-    return " ".join(extracted) if extracted else "No relevant event information found."
\ No newline at end of file
+from verifier.keyword_scanner import DEFAULT_EVENT, get_scanner
+
+def extract_linkedin_info(text, event=DEFAULT_EVENT):
+    scanner, _ = get_scanner(event, "linkedin")
+    extracted = scanner.matching_lines(text)
+    return " ".join(extracted) if extracted else "No relevant event information found."
@@ -1,12 +1,11 @@
 from PyPDF2 import PdfReader
+from verifier.keyword_scanner import DEFAULT_EVENT, get_scanner
 
-def verify_event_ticket(pdf_file):
+def verify_event_ticket(pdf_file, event=DEFAULT_EVENT):
     reader = PdfReader(pdf_file)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
+    scanner, threshold = get_scanner(event, "ticket")
 
-    keywords = ["Google", "DevFest", "Ticket", "Pass", "QR", "Session", "2024"]
-    found_keywords = [kw for kw in keywords if kw.lower() in text.lower()]
+    # Pages are extracted one at a time and scanning stops as soon as the threshold is met.
+    found_keywords, _ = scanner.scan_pages((page.extract_text() for page in reader.pages), threshold)
 
-    return len(found_keywords) >= 2, found_keywords
\ No newline at end of file
+    return len(found_keywords) >= threshold, found_keywords